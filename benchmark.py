@@ -0,0 +1,319 @@
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from calculator import (
+    get_compiled_patterns,
+    create_numeric_backend,
+    create_precedence_map,
+    create_right_associative_set,
+    tokenize_expression,
+    build_syntax_tree,
+    evaluate_expression_tree,
+    compile_to_bytecode,
+    link_bytecode,
+    execute_program,
+    calculate_many
+)
+
+Stage = Tuple[Callable[[str], Any], Callable[[Any], Any]]
+
+def create_corpora() -> Dict[str, List[str]]:
+    return {
+        'short': [
+            "3 + 5 * 2",
+            "(3 + 5) * 2 - 10 / 4",
+            "2 ^ 3 ^ 2 + 1.5",
+            "-5 + 3 * -2",
+            "pi * 2 + e ^ 2",
+            "((2 + 3) * 4) ^ 2 / 7"
+        ],
+        'long_sum': [
+            " + ".join(str(i % 97) for i in range(10000))
+        ],
+        'nested': [
+            "(" * 2000 + "1 + 2" + ")" * 2000,
+            "-(" * 1000 + "3" + ")" * 1000
+        ],
+        'functions': [
+            "sin(cos(tan(0.5))) + sqrt(abs(-16)) * exp(log(2))",
+            " + ".join(f"sin({i}) * cos({i}) + sqrt({i})" for i in range(200)),
+            "abs(" * 300 + "-1" + ")" * 300
+        ]
+    }
+
+def create_stages(backend_name: str = 'float') -> Dict[str, Stage]:
+    backend = create_numeric_backend(backend_name)
+    patterns = get_compiled_patterns()
+    constants = backend.constants
+    operations = backend.operations
+    functions = backend.functions
+    precedence = create_precedence_map()
+    right_associative = create_right_associative_set()
+
+    def tokenize(expression: str) -> list:
+        return tokenize_expression(expression, patterns)
+
+    def parse(tokens: list):
+        return build_syntax_tree(
+            tokens, constants, functions, precedence, right_associative,
+            backend.number_type
+        )
+
+    def evaluate(tree) -> float:
+        with backend.activate():
+            return evaluate_expression_tree(tree, operations, functions)
+
+    def execute(program: list) -> float:
+        with backend.activate():
+            return execute_program(program)
+
+    def prepare_program(expression: str) -> list:
+        bytecode = compile_to_bytecode(
+            parse(tokenize(expression)), operations, functions, optimize=False
+        )
+        return link_bytecode(bytecode, operations, functions)
+
+    return {
+        'tokenize': (lambda expression: expression, tokenize),
+        'parse': (tokenize, parse),
+        'evaluate': (lambda expression: parse(tokenize(expression)), evaluate),
+        'vm': (prepare_program, execute)
+    }
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+def measure_latencies(
+    run: Callable[[Any], Any],
+    inputs: List[Any],
+    min_runs: int,
+    min_seconds: float
+) -> List[float]:
+    latencies = []
+    started = time.perf_counter()
+
+    while len(latencies) < min_runs or time.perf_counter() - started < min_seconds:
+        for prepared in inputs:
+            operation_started = time.perf_counter()
+            run(prepared)
+            latencies.append(time.perf_counter() - operation_started)
+
+    return latencies
+
+def measure_allocations(run: Callable[[Any], Any], inputs: List[Any]) -> Dict[str, int]:
+    tracemalloc.start()
+
+    try:
+        before = tracemalloc.take_snapshot()
+        results = [run(prepared) for prepared in inputs]
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    retained = after.compare_to(before, 'filename')
+    del results
+
+    return {
+        'alloc_peak_bytes': peak_bytes // len(inputs),
+        'alloc_blocks': sum(max(stat.count_diff, 0) for stat in retained) // len(inputs)
+    }
+
+def run_benchmarks(
+    corpora: Dict[str, List[str]],
+    stages: Dict[str, Stage],
+    min_runs: int = 50,
+    min_seconds: float = 0.5,
+    suffix: str = ''
+) -> Dict[str, Dict[str, float]]:
+    results = {}
+
+    for corpus_name, expressions in corpora.items():
+        for stage_name, (prepare, run) in stages.items():
+            inputs = [prepare(expression) for expression in expressions]
+            latencies = sorted(measure_latencies(run, inputs, min_runs, min_seconds))
+            total = sum(latencies)
+
+            result = {
+                'runs': len(latencies),
+                'ops_per_second': len(latencies) / total if total else 0.0,
+                'p50_us': percentile(latencies, 0.50) * 1e6,
+                'p99_us': percentile(latencies, 0.99) * 1e6
+            }
+            result.update(measure_allocations(run, inputs))
+            results[f"{corpus_name}/{stage_name}{suffix}"] = result
+
+    return results
+
+def create_scaling_corpus(size: int = 20000) -> List[str]:
+    return [
+        f"{i} * sin({i % 360}) + sqrt({i}) - ({i} + 1) / 3 ^ 2"
+        for i in range(size)
+    ]
+
+def is_gil_enabled() -> bool:
+    check = getattr(sys, '_is_gil_enabled', None)
+
+    return True if check is None else check()
+
+def measure_threads(expressions: List[str], threads: int, chunksize: int) -> float:
+    started = time.perf_counter()
+    calculate_many(
+        expressions, workers=threads, chunksize=chunksize,
+        cache_size=len(expressions), executor='thread'
+    )
+
+    return time.perf_counter() - started
+
+def run_scaling_benchmark(
+    expressions: List[str],
+    thread_counts: List[int],
+    chunksize: int = 256
+) -> List[Dict[str, float]]:
+    timings = {threads: measure_threads(expressions, threads, chunksize) for threads in thread_counts}
+
+    if 1 not in timings:
+        timings[1] = measure_threads(expressions, 1, chunksize)
+
+    baseline = timings[1]
+    results = []
+
+    for threads in thread_counts:
+        seconds = timings[threads]
+
+        results.append({
+            'threads': threads,
+            'seconds': seconds,
+            'expressions_per_second': len(expressions) / seconds,
+            'speedup': baseline / seconds,
+            'efficiency': baseline / seconds / threads
+        })
+
+    return results
+
+def print_scaling(results: List[Dict[str, float]]) -> None:
+    print(f"GIL {'включён' if is_gil_enabled() else 'отключён'}")
+    print(f"{'потоков':>8}{'секунд':>10}{'выр/с':>12}{'ускорение':>12}{'эффективность':>15}")
+
+    for result in results:
+        print(
+            f"{result['threads']:>8}{result['seconds']:>10.3f}"
+            f"{result['expressions_per_second']:>12.1f}"
+            f"{result['speedup']:>12.2f}{result['efficiency']:>15.2f}"
+        )
+
+def create_report(results: Dict[str, Dict[str, float]]) -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+def compare_with_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    regressions = []
+
+    for name, result in results.items():
+        previous = baseline['results'].get(name)
+
+        if previous is None:
+            continue
+
+        ratio = result['ops_per_second'] / previous['ops_per_second']
+        if ratio < 1 - tolerance:
+            regressions.append(
+                f"{name}: {previous['ops_per_second']:.1f} -> "
+                f"{result['ops_per_second']:.1f} оп/с ({(ratio - 1) * 100:+.1f}%)"
+            )
+
+    return regressions
+
+def print_results(results: Dict[str, Dict[str, float]]) -> None:
+    print(f"{'тест':<32}{'оп/с':>12}{'p50, мкс':>12}{'p99, мкс':>12}{'пик, байт':>14}{'блоков':>10}")
+
+    for name, result in results.items():
+        print(
+            f"{name:<32}{result['ops_per_second']:>12.1f}"
+            f"{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}"
+            f"{result['alloc_peak_bytes']:>14}{result['alloc_blocks']:>10}"
+        )
+
+def select(items: Dict[str, Any], names: Optional[List[str]]) -> Dict[str, Any]:
+    if not names:
+        return items
+
+    unknown = [name for name in names if name not in items]
+    if unknown:
+        raise ValueError(f"Неизвестные имена: {', '.join(unknown)}")
+
+    return {name: items[name] for name in names}
+
+def parse_arguments(arguments: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Замеры производительности калькулятора")
+    parser.add_argument('--corpus', action='append', help="набор выражений (можно повторять)")
+    parser.add_argument('--stage', action='append', help="этап (можно повторять)")
+    parser.add_argument('--backend', action='append', choices=['float', 'fraction', 'decimal'],
+                        help="числовой тип (можно повторять, по умолчанию float)")
+    parser.add_argument('--min-runs', type=int, default=50)
+    parser.add_argument('--min-seconds', type=float, default=0.5)
+    parser.add_argument('--save', metavar='FILE', help="сохранить результаты в JSON")
+    parser.add_argument('--compare', metavar='FILE', help="сравнить с сохранёнными результатами")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="допустимое падение оп/с относительно базы")
+    parser.add_argument('--scaling', metavar='THREADS', type=int, nargs='+',
+                        help="замерить масштабирование calculate_many по потокам")
+    parser.add_argument('--scaling-size', type=int, default=20000,
+                        help="количество выражений для замера масштабирования")
+
+    return parser.parse_args(arguments)
+
+def main(arguments: Optional[List[str]] = None) -> int:
+    arguments = parse_arguments(arguments)
+
+    if arguments.scaling:
+        print_scaling(run_scaling_benchmark(
+            create_scaling_corpus(arguments.scaling_size), arguments.scaling
+        ))
+        return 0
+
+    corpora = select(create_corpora(), arguments.corpus)
+    results = {}
+
+    for backend_name in arguments.backend or ['float']:
+        stages = select(create_stages(backend_name), arguments.stage)
+        suffix = '' if backend_name == 'float' else f"@{backend_name}"
+        results.update(run_benchmarks(
+            corpora, stages, arguments.min_runs, arguments.min_seconds, suffix
+        ))
+
+    print_results(results)
+
+    if arguments.save:
+        with open(arguments.save, 'w', encoding='utf-8') as file:
+            json.dump(create_report(results), file, indent=2, ensure_ascii=False)
+
+    if not arguments.compare:
+        return 0
+
+    with open(arguments.compare, encoding='utf-8') as file:
+        regressions = compare_with_baseline(results, json.load(file), arguments.tolerance)
+
+    for regression in regressions:
+        print(f"Регрессия: {regression}")
+
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
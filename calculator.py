@@ -1,9 +1,29 @@
+from __future__ import annotations
+
+import os
 import re
+import sys
 import math
+import time
+import struct
+import threading
+
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from contextlib import nullcontext
+from functools import lru_cache
+from itertools import islice
 
-from typing import List, Tuple, Union, Dict, Callable, Optional
+from typing import (
+    Any, List, Tuple, Union, Dict, Callable, Optional, Sequence, Iterable, Iterator, TextIO
+)
+
+np = None
 
 class Node:
+    __slots__ = ('type', 'value', 'left', 'right')
+
     def __init__(
         self,
         node_type: str,
@@ -16,11 +36,516 @@ class Node:
         self.left = left
         self.right = right
 
-def create_token_patterns() -> List[Tuple[str, Optional[str]]]:
+NODE_OPCODES = {'NUMBER': 0, 'VARIABLE': 1, 'OPERATOR': 2, 'FUNCTION': 3, 'UNARY': 4}
+NODE_TYPES = ('NUMBER', 'VARIABLE', 'OPERATOR', 'FUNCTION', 'UNARY')
+
+class FlatTree:
+    __slots__ = ('opcodes', 'operands', 'lefts', 'rights', 'pool')
+
+    def __init__(self):
+        self.opcodes = array('B')
+        self.operands = array('i')
+        self.lefts = array('i')
+        self.rights = array('i')
+        self.pool = []
+
+BYTECODE_PUSH = 0
+BYTECODE_BINARY = 1
+BYTECODE_CALL = 2
+BYTECODE_NEGATE = 3
+BYTECODE_LOAD = 4
+
+BYTECODE_MAGIC = b'CALC'
+BYTECODE_VERSION = 2
+
+class Bytecode:
+    __slots__ = ('opcodes', 'arguments', 'constants', 'names')
+
+    def __init__(self):
+        self.opcodes = array('B')
+        self.arguments = array('I')
+        self.constants = []
+        self.names = []
+
+DISK_CACHE_HEADER = b'CALCDC02'
+DISK_CACHE_RECORD = struct.Struct('<32sII')
+
+class DiskCache:
+    def __init__(self, directory: str, fingerprint: str):
+        os.makedirs(directory, exist_ok=True)
+
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self.path = os.path.join(directory, f"{fingerprint}.bin")
+        self.file = open(self.path, 'a+b')
+        self.mapping = None
+        self.mapped_size = 0
+        self.index = {}
+        self.writable = True
+        self.lock = threading.Lock()
+
+        self.load_index()
+
+    def remap(self) -> None:
+        import mmap
+
+        if self.mapping is not None:
+            self.mapping.close()
+
+        self.file.flush()
+        self.mapping = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mapped_size = len(self.mapping)
+
+    def write_header(self) -> None:
+        import fcntl
+
+        descriptor = self.file.fileno()
+        fcntl.flock(descriptor, fcntl.LOCK_EX)
+
+        try:
+            if os.fstat(descriptor).st_size == 0:
+                os.write(descriptor, DISK_CACHE_HEADER)
+        finally:
+            fcntl.flock(descriptor, fcntl.LOCK_UN)
+
+    def load_index(self) -> None:
+        from zlib import crc32
+
+        self.write_header()
+        self.remap()
+
+        if self.mapping[:len(DISK_CACHE_HEADER)] != DISK_CACHE_HEADER:
+            self.writable = False
+            return
+
+        offset = len(DISK_CACHE_HEADER)
+
+        while offset + DISK_CACHE_RECORD.size <= self.mapped_size:
+            key, length, checksum = DISK_CACHE_RECORD.unpack_from(self.mapping, offset)
+            payload_offset = offset + DISK_CACHE_RECORD.size
+
+            if (
+                payload_offset + length > self.mapped_size
+                or crc32(self.mapping[payload_offset:payload_offset + length]) != checksum
+            ):
+                break
+
+            self.index[key] = (payload_offset, length)
+            offset = payload_offset + length
+
+        if offset < self.mapped_size:
+            self.writable = False
+
+    def get(self, expression: str) -> Optional[Bytecode]:
+        location = self.index.get(hash_expression(expression))
+
+        if location is None:
+            return None
+
+        offset, length = location
+
+        with self.lock:
+            if offset + length > self.mapped_size:
+                self.remap()
+
+            return bytecode_from_bytes(memoryview(self.mapping)[offset:offset + length])
+
+    def put(self, expression: str, bytecode: Bytecode) -> None:
+        key = hash_expression(expression)
+
+        if key in self.index or not self.writable:
+            return
+
+        from zlib import crc32
+
+        payload = bytecode_to_bytes(bytecode)
+        record = DISK_CACHE_RECORD.pack(key, len(payload), crc32(payload)) + payload
+
+        with self.lock:
+            if key in self.index:
+                return
+
+            self.file.flush()
+            descriptor = self.file.fileno()
+            os.write(descriptor, record)
+            offset = os.lseek(descriptor, 0, os.SEEK_CUR) - len(record)
+
+            self.index[key] = (offset + DISK_CACHE_RECORD.size, len(payload))
+
+    def prune(self) -> int:
+        removed = 0
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+
+            if name == os.path.basename(self.path) or not re.fullmatch(r'[0-9a-f]{32}\.bin', name):
+                continue
+
+            with open(path, 'rb') as file:
+                if file.read(len(DISK_CACHE_HEADER)) != DISK_CACHE_HEADER:
+                    continue
+
+            os.remove(path)
+            removed += 1
+
+        return removed
+
+    def close(self) -> None:
+        with self.lock:
+            if self.mapping is not None:
+                self.mapping.close()
+                self.mapping = None
+
+            self.file.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __enter__(self) -> 'DiskCache':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class CacheShard:
+    __slots__ = ('maxsize', 'entries', 'lock', 'hits', 'misses', 'evictions')
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+class ParseCache:
+    def __init__(self, maxsize: int = 256, stripes: int = 8):
+        if maxsize < 1:
+            raise ValueError("Размер кэша должен быть положительным")
+
+        if stripes < 1:
+            raise ValueError("Количество сегментов кэша должно быть положительным")
+
+        stripes = min(stripes, maxsize)
+        self.maxsize = maxsize
+        self.shards = [CacheShard(maxsize // stripes) for _ in range(stripes)]
+
+        for index in range(maxsize % stripes):
+            self.shards[index].maxsize += 1
+
+    def get(self, expression: str) -> Optional[Callable]:
+        shard = self.shards[hash(expression) % len(self.shards)]
+
+        with shard.lock:
+            compiled = shard.entries.get(expression)
+
+            if compiled is None:
+                shard.misses += 1
+                return None
+
+            shard.entries.move_to_end(expression)
+            shard.hits += 1
+            return compiled
+
+    def put(self, expression: str, compiled: Callable) -> None:
+        shard = self.shards[hash(expression) % len(self.shards)]
+
+        with shard.lock:
+            shard.entries[expression] = compiled
+            shard.entries.move_to_end(expression)
+
+            if len(shard.entries) > shard.maxsize:
+                shard.entries.popitem(last=False)
+                shard.evictions += 1
+
+    def invalidate(self) -> None:
+        for shard in self.shards:
+            with shard.lock:
+                shard.entries.clear()
+
+    def statistics(self) -> Dict[str, int]:
+        statistics = {
+            'size': 0,
+            'maxsize': self.maxsize,
+            'stripes': len(self.shards),
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+        for shard in self.shards:
+            with shard.lock:
+                statistics['size'] += len(shard.entries)
+                statistics['hits'] += shard.hits
+                statistics['misses'] += shard.misses
+                statistics['evictions'] += shard.evictions
+
+        return statistics
+
+class HistogramSink:
+    STAGES = (
+        'tokenize_seconds', 'parse_seconds', 'compile_seconds',
+        'evaluate_seconds', 'total_seconds'
+    )
+
+    def __init__(self):
+        self.count = 0
+        self.cached = 0
+        self.errors = 0
+        self.totals = {stage: 0.0 for stage in self.STAGES}
+        self.buckets = {stage: {} for stage in self.STAGES}
+        self.lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        with self.lock:
+            self.count += 1
+            self.cached += record['cached']
+            self.errors += 'error' in record
+
+            for stage in self.STAGES:
+                seconds = record.get(stage)
+                if seconds is None:
+                    continue
+
+                bucket = 2.0 ** math.frexp(seconds)[1] if seconds > 0 else 0.0
+                self.totals[stage] += seconds
+                self.buckets[stage][bucket] = self.buckets[stage].get(bucket, 0) + 1
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            return self.create_summary()
+
+    def create_summary(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'cached': self.cached,
+            'errors': self.errors,
+            'totals': dict(self.totals),
+            'buckets': {
+                stage: dict(sorted(buckets.items()))
+                for stage, buckets in self.buckets.items()
+            }
+        }
+
+class JsonlSink:
+    def __init__(self, path: str):
+        import json
+
+        self.dumps = json.dumps
+        self.file = open(path, 'a', encoding='utf-8')
+        self.lock = threading.Lock()
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        line = self.dumps(record, ensure_ascii=False) + '\n'
+
+        with self.lock:
+            self.file.write(line)
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+
+    def __enter__(self) -> 'JsonlSink':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+class NumericBackend:
+    __slots__ = ('name', 'number_type', 'constants', 'operations', 'functions', 'context')
+
+    def __init__(
+        self,
+        name: str,
+        number_type: Callable[[str], Any],
+        constants: Dict[str, Any],
+        operations: Dict[str, Callable],
+        functions: Dict[str, Callable],
+        context: Any = None
+    ):
+        self.name = name
+        self.number_type = number_type
+        self.constants = constants
+        self.operations = operations
+        self.functions = functions
+        self.context = context
+
+    def describe(self) -> str:
+        return self.name if self.context is None else f"{self.name}:{self.context.prec}"
+
+    def activate(self) -> Any:
+        if self.context is None:
+            return nullcontext()
+
+        import decimal
+
+        return decimal.localcontext(self.context)
+
+class ResourceLimitError(ValueError):
+    pass
+
+class ResourceLimits:
+    __slots__ = ('max_tokens', 'max_depth', 'max_magnitude', 'time_budget')
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_depth: Optional[int] = None,
+        max_magnitude: Optional[float] = None,
+        time_budget: Optional[float] = None
+    ):
+        self.max_tokens = max_tokens
+        self.max_depth = max_depth
+        self.max_magnitude = max_magnitude
+        self.time_budget = time_budget
+
+class ResourceGuard:
+    def __init__(self, limits: ResourceLimits):
+        self.limits = limits
+        self.local = threading.local()
+        self.max_digits = None
+
+        if limits.max_magnitude is not None:
+            self.max_digits = math.log10(limits.max_magnitude)
+
+    def run(self, function: Callable, *arguments: Any) -> Any:
+        if self.limits.time_budget is None:
+            return function(*arguments)
+
+        previous = getattr(self.local, 'deadline', None)
+        if previous is None:
+            self.local.deadline = time.monotonic() + self.limits.time_budget
+
+        try:
+            return function(*arguments)
+        finally:
+            self.local.deadline = previous
+
+    def check_deadline(self) -> None:
+        deadline = getattr(self.local, 'deadline', None)
+
+        if deadline is not None and time.monotonic() > deadline:
+            raise ResourceLimitError(
+                f"Превышено время вычисления: {self.limits.time_budget} с"
+            )
+
+    def limit_tokens(self, tokens: Iterable[Tuple[str, str]]) -> Iterator[Tuple[str, str]]:
+        limit = self.limits.max_tokens
+
+        for count, token in enumerate(tokens, 1):
+            if limit is not None and count > limit:
+                raise ResourceLimitError(f"Слишком много токенов: больше {limit}")
+            yield token
+
+    def check_depth(self, tree: Node) -> None:
+        limit = self.limits.max_depth
+
+        if limit is not None and measure_tree_depth(tree) > limit:
+            raise ResourceLimitError(f"Слишком большая глубина выражения: больше {limit}")
+
+    def check_magnitude(self, value: Any) -> Any:
+        limit = self.limits.max_magnitude
+
+        if limit is not None and abs(value) > limit:
+            raise ResourceLimitError(f"Промежуточное значение превышает {limit:g} по модулю")
+
+        return value
+
+    def check_power(self, base: Any, exponent: Any) -> None:
+        if self.max_digits is None:
+            return
+
+        try:
+            if type(base) is not int and hasattr(base, 'denominator'):
+                if base == 0:
+                    return
+
+                digits = float(exponent) * (
+                    math.log10(abs(base.numerator)) - math.log10(base.denominator)
+                )
+            elif exponent > 0 and abs(base) > 1:
+                digits = float(exponent) * math.log10(abs(base))
+            else:
+                return
+        except TypeError:
+            return
+        except OverflowError:
+            digits = math.inf
+
+        if digits > self.max_digits:
+            raise ResourceLimitError(
+                f"Промежуточное значение превышает {self.limits.max_magnitude:g} по модулю"
+            )
+
+    def wrap_operation(self, name: str, operation: Callable) -> Callable:
+        def guarded(a: Any, b: Any) -> Any:
+            self.check_deadline()
+            if name == '^':
+                self.check_power(a, b)
+
+            return self.check_magnitude(operation(a, b))
+
+        guarded.__wrapped__ = operation
+
+        return guarded
+
+    def wrap_function(self, function: Callable) -> Callable:
+        def guarded(x: Any) -> Any:
+            self.check_deadline()
+
+            return self.check_magnitude(function(x))
+
+        guarded.__wrapped__ = function
+
+        return guarded
+
+    def check_variables(self, variables: Optional[Dict[str, Any]]) -> None:
+        if self.limits.max_magnitude is None or not variables:
+            return
+
+        for value in variables.values():
+            self.check_magnitude(value)
+
+    def check_bindings(self, bindings: Dict[str, Sequence[Any]]) -> None:
+        if self.limits.max_magnitude is None:
+            return
+
+        for column in bindings.values():
+            for value in column:
+                self.check_magnitude(value)
+
+    def wrap_operations(self, operations: Dict[str, Callable]) -> Dict[str, Callable]:
+        return {name: self.wrap_operation(name, operation) for name, operation in operations.items()}
+
+    def wrap_functions(self, functions: Dict[str, Callable]) -> Dict[str, Callable]:
+        return {name: self.wrap_function(function) for name, function in functions.items()}
+
+def join_token_names(names: Iterable[str]) -> str:
+    ordered = sorted(names, key=lambda name: (-len(name), name))
+
+    if not ordered:
+        return r'(?!)'
+
+    return '(?:' + '|'.join(re.escape(name) for name in ordered) + r')\b'
+
+def create_token_patterns(
+    function_names: Optional[Iterable[str]] = None,
+    constant_names: Optional[Iterable[str]] = None
+) -> List[Tuple[str, Optional[str]]]:
+    functions_pattern = r'(?:sin|cos|tan|sqrt|log|exp|abs)\b'
+    constants_pattern = r'(?:pi|e)\b'
+
+    if function_names is not None:
+        functions_pattern = join_token_names(function_names)
+
+    if constant_names is not None:
+        constants_pattern = join_token_names(constant_names)
+
     return [
         (r'\d+(?:\.\d+)?', 'NUMBER'),
-        (r'sin|cos|tan|sqrt|log|exp|abs', 'FUNCTION'),
-        (r'pi|e', 'CONSTANT'),
+        (functions_pattern, 'FUNCTION'),
+        (constants_pattern, 'CONSTANT'),
+        (r'[A-Za-z_]\w*', 'VARIABLE'),
         (r'[\+\-\*/\^]', 'OPERATOR'),
         (r'[\(\)]', 'PAREN'),
         (r'\s+', None),
@@ -32,13 +557,81 @@ def create_constants_map() -> Dict[str, float]:
         'e': math.e
     }
 
+MAX_INTEGER_BITS = 8192
+
+def convert_to_float(value: Union[int, float]) -> float:
+    try:
+        return float(value)
+    except OverflowError:
+        return math.inf if value > 0 else -math.inf
+
+def is_real_number(value: Any) -> bool:
+    return type(value) is int or type(value) is float
+
+def add_numbers(a: Union[int, float], b: Union[int, float]) -> Union[int, float]:
+    try:
+        return a + b
+    except OverflowError:
+        if not (is_real_number(a) and is_real_number(b)):
+            raise
+
+        return convert_to_float(a) + convert_to_float(b)
+
+def subtract_numbers(a: Union[int, float], b: Union[int, float]) -> Union[int, float]:
+    try:
+        return a - b
+    except OverflowError:
+        if not (is_real_number(a) and is_real_number(b)):
+            raise
+
+        return convert_to_float(a) - convert_to_float(b)
+
+def multiply_numbers(a: Union[int, float], b: Union[int, float]) -> Union[int, float]:
+    if type(a) is int and type(b) is int and a.bit_length() + b.bit_length() > MAX_INTEGER_BITS:
+        return convert_to_float(a) * convert_to_float(b)
+
+    try:
+        return a * b
+    except OverflowError:
+        if not (is_real_number(a) and is_real_number(b)):
+            raise
+
+        return convert_to_float(a) * convert_to_float(b)
+
+def divide_numbers(a: Union[int, float], b: Union[int, float]) -> float:
+    if b == 0:
+        return float('inf')
+
+    try:
+        return a / b
+    except OverflowError:
+        if not (is_real_number(a) and is_real_number(b)):
+            raise
+
+        return convert_to_float(a) / convert_to_float(b)
+
+def power_numbers(base: Union[int, float], exponent: Union[int, float]) -> Union[int, float]:
+    if (
+        type(base) is int and type(exponent) is int and exponent > 0 and base != 0
+        and exponent * math.log2(abs(base)) > MAX_INTEGER_BITS
+    ):
+        return convert_to_float(base) ** convert_to_float(exponent)
+
+    try:
+        return base ** exponent
+    except OverflowError:
+        if not (is_real_number(base) and is_real_number(exponent)):
+            raise
+
+        return convert_to_float(base) ** convert_to_float(exponent)
+
 def create_operations_map() -> Dict[str, Callable[[float, float], float]]:
     return {
-        '+': lambda a, b: a + b,
-        '-': lambda a, b: a - b,
-        '*': lambda a, b: a * b,
-        '/': lambda a, b: a / b if b != 0 else float('inf'),
-        '^': lambda a, b: a ** b
+        '+': add_numbers,
+        '-': subtract_numbers,
+        '*': multiply_numbers,
+        '/': divide_numbers,
+        '^': power_numbers
     }
 
 def create_functions_map() -> Dict[str, Callable[[float], float]]:
@@ -52,38 +645,196 @@ def create_functions_map() -> Dict[str, Callable[[float], float]]:
         'abs': abs
     }
 
+def wrap_float_function(
+    function: Callable[[float], float],
+    convert: Callable[[float], Any]
+) -> Callable[[Any], Any]:
+    return lambda x: convert(function(x))
+
+def create_float_backend() -> NumericBackend:
+    return NumericBackend(
+        'float', convert_number_literal, create_constants_map(),
+        create_operations_map(), create_functions_map()
+    )
+
+def divide_fractions(a: Any, b: Any) -> Any:
+    if b == 0:
+        raise ZeroDivisionError("Деление на ноль")
+
+    return a / b
+
+def power_fractions(base: Any, exponent: Any) -> Any:
+    from fractions import Fraction
+
+    if exponent.denominator == 1:
+        bits = max(base.numerator.bit_length(), base.denominator.bit_length())
+
+        if abs(exponent.numerator) * bits <= MAX_INTEGER_BITS:
+            return base ** exponent.numerator
+
+    result = float(base) ** float(exponent)
+    if isinstance(result, complex):
+        raise ValueError("Результат не является действительным числом")
+
+    return Fraction(result)
+
+def sqrt_fraction(x: Any) -> Any:
+    from fractions import Fraction
+
+    if x < 0:
+        raise ValueError("Корень из отрицательного числа")
+
+    numerator = math.isqrt(x.numerator)
+    denominator = math.isqrt(x.denominator)
+
+    if numerator * numerator == x.numerator and denominator * denominator == x.denominator:
+        return Fraction(numerator, denominator)
+
+    return Fraction(math.sqrt(x))
+
+def create_fraction_backend() -> NumericBackend:
+    from fractions import Fraction
+
+    return NumericBackend(
+        'fraction',
+        Fraction,
+        {name: Fraction(value) for name, value in create_constants_map().items()},
+        {
+            '+': lambda a, b: a + b,
+            '-': lambda a, b: a - b,
+            '*': lambda a, b: a * b,
+            '/': divide_fractions,
+            '^': power_fractions
+        },
+        {
+            'sin': wrap_float_function(math.sin, Fraction),
+            'cos': wrap_float_function(math.cos, Fraction),
+            'tan': wrap_float_function(math.tan, Fraction),
+            'sqrt': sqrt_fraction,
+            'log': wrap_float_function(math.log, Fraction),
+            'exp': wrap_float_function(math.exp, Fraction),
+            'abs': abs
+        }
+    )
+
+def compute_decimal_pi(context: Any) -> Any:
+    import decimal
+
+    with decimal.localcontext(context) as local:
+        local.prec += 2
+        term = decimal.Decimal(3)
+        previous, total = 0, term
+        numerator, numerator_step = 1, 0
+        denominator, denominator_step = 0, 24
+
+        while total != previous:
+            previous = total
+            numerator, numerator_step = numerator + numerator_step, numerator_step + 8
+            denominator, denominator_step = denominator + denominator_step, denominator_step + 32
+            term = term * numerator / denominator
+            total += term
+
+    return context.plus(total)
+
+def create_decimal_backend(precision: int = 28) -> NumericBackend:
+    import decimal
+
+    if precision < 1:
+        raise ValueError("Точность должна быть положительной")
+
+    context = decimal.Context(prec=precision)
+    convert = context.create_decimal_from_float
+
+    return NumericBackend(
+        'decimal',
+        context.create_decimal,
+        {'pi': compute_decimal_pi(context), 'e': context.exp(1)},
+        {
+            '+': context.add,
+            '-': context.subtract,
+            '*': context.multiply,
+            '/': context.divide,
+            '^': context.power
+        },
+        {
+            'sin': wrap_float_function(math.sin, convert),
+            'cos': wrap_float_function(math.cos, convert),
+            'tan': wrap_float_function(math.tan, convert),
+            'sqrt': context.sqrt,
+            'log': context.ln,
+            'exp': context.exp,
+            'abs': context.abs
+        },
+        context
+    )
+
+def create_numeric_backend(name: str = 'float', precision: Optional[int] = None) -> NumericBackend:
+    if name == 'float':
+        return create_float_backend()
+
+    if name == 'fraction':
+        return create_fraction_backend()
+
+    if name == 'decimal':
+        return create_decimal_backend(28 if precision is None else precision)
+
+    raise ValueError(f"Неизвестный числовой тип: {name}")
+
 def create_precedence_map() -> Dict[str, int]:
     return {'+': 1, '-': 1, '*': 2, '/': 2, '^': 3, 'u-': 4, 'u+': 4}
 
 def create_right_associative_set() -> set:
     return {'^', 'u-', 'u+'}
 
-def get_compiled_patterns() -> List[Tuple[re.Pattern, Optional[str]]]:
-    patterns = create_token_patterns()
+def get_compiled_patterns(
+    function_names: Optional[Iterable[str]] = None,
+    constant_names: Optional[Iterable[str]] = None
+) -> List[Tuple[re.Pattern, Optional[str]]]:
+    patterns = create_token_patterns(function_names, constant_names)
     return [(re.compile(pattern), token_type) for pattern, token_type in patterns]
 
-def match_token_at_position(
-    expression: str, 
-    position: int, 
+def combine_compiled_patterns(
     patterns: List[Tuple[re.Pattern, Optional[str]]]
-) -> Optional[Tuple[str, str, int]]:
-    for pattern, token_type in patterns:
-        match = pattern.match(expression, position)
-        
-        if not match:
-            continue
+) -> Tuple[re.Pattern, Dict[str, Optional[str]]]:
+    return combine_pattern_tuple(tuple(patterns))
+
+@lru_cache(maxsize=64)
+def combine_pattern_tuple(
+    patterns: Tuple[Tuple[re.Pattern, Optional[str]], ...]
+) -> Tuple[re.Pattern, Dict[str, Optional[str]]]:
+    alternatives = []
+    group_types = {}
+
+    for index, (pattern, token_type) in enumerate(patterns):
+        group_name = f'T{index}'
+        alternatives.append(f'(?P<{group_name}>{pattern.pattern})')
+        group_types[group_name] = token_type
+
+    alternatives.append('(?P<MISMATCH>.)')
+
+    return re.compile('|'.join(alternatives), re.DOTALL), group_types
 
-        value = match.group()
-        return token_type, value, match.end()
+def convert_number_literal(value: str) -> Union[int, float]:
+    if '.' in value:
+        return float(value)
 
-    return None
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
 
-def create_number_node(value: str) -> Node:
-    return Node('NUMBER', float(value))
+def create_number_node(
+    value: str,
+    number_type: Callable[[str], Any] = convert_number_literal
+) -> Node:
+    return Node('NUMBER', number_type(value))
 
 def create_constant_node(value: str, constants: Dict[str, float]) -> Node:
     return Node('NUMBER', constants[value])
 
+def create_variable_node(name: str) -> Node:
+    return Node('VARIABLE', name)
+
 def should_be_unary(
     current_token_type: str,
     current_token_value: str,
@@ -195,30 +946,109 @@ def process_right_parenthesis(
 
 def tokenize_expression(
     expression: str,
-    patterns: List[Tuple[re.Pattern, Optional[str]]]
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    guard: Optional[ResourceGuard] = None
+) -> List[Tuple[str, str]]:
+    master_pattern, group_types = combine_compiled_patterns(patterns)
+
+    if guard is not None and guard.limits.max_tokens is not None:
+        return list(guard.limit_tokens(iterate_tokens(expression, master_pattern, group_types)))
+
+    return scan_tokens(expression, master_pattern, group_types)
+
+def scan_tokens(
+    expression: str,
+    master_pattern: re.Pattern,
+    group_types: Dict[str, Optional[str]]
 ) -> List[Tuple[str, str]]:
     tokens = []
-    position = 0
     
-    while position < len(expression):
-        match_result = match_token_at_position(expression, position, patterns)
-        
-        if match_result:
-            token_type, value, new_position = match_result
-            if token_type:
-                tokens.append((token_type, value))
-            position = new_position
-        else:
-            raise ValueError(f'Некорректный символ: {expression[position]}')
+    for match in master_pattern.finditer(expression):
+        group_name = match.lastgroup
+
+        if group_name == 'MISMATCH':
+            raise ValueError(f'Некорректный символ: {match.group()}')
+
+        token_type = group_types[group_name]
+        if token_type:
+            tokens.append((token_type, match.group()))
     
     return tokens
 
+STREAM_CHUNK_SIZE = 1 << 16
+STREAM_LOOKAHEAD = 16
+
+def read_text_chunks(
+    source: Union[str, TextIO, Iterable[str]],
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[str]:
+    if isinstance(source, str):
+        yield source
+        return
+
+    read = getattr(source, 'read', None)
+    if read is None:
+        yield from source
+        return
+
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def iterate_tokens(
+    source: Union[str, TextIO, Iterable[str]],
+    master_pattern: re.Pattern,
+    group_types: Dict[str, Optional[str]],
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[Tuple[str, str]]:
+    chunks = read_text_chunks(source, chunk_size)
+    buffer = ''
+    finished = False
+
+    while not finished:
+        chunk = next(chunks, None)
+        finished = chunk is None
+
+        if not finished:
+            buffer += chunk
+
+        limit = len(buffer) if finished else len(buffer) - STREAM_LOOKAHEAD
+        position = 0
+
+        for match in master_pattern.finditer(buffer):
+            if match.end() > limit:
+                break
+
+            position = match.end()
+            group_name = match.lastgroup
+
+            if group_name == 'MISMATCH':
+                raise ValueError(f'Некорректный символ: {match.group()}')
+
+            token_type = group_types[group_name]
+            if token_type:
+                yield token_type, match.group()
+
+        buffer = buffer[position:]
+
+def stream_tokens(
+    source: Union[str, TextIO, Iterable[str]],
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    chunk_size: int = STREAM_CHUNK_SIZE
+) -> Iterator[Tuple[str, str]]:
+    master_pattern, group_types = combine_compiled_patterns(patterns)
+
+    return iterate_tokens(source, master_pattern, group_types, chunk_size)
+
 def build_syntax_tree(
-    tokens: List[Tuple[str, str]],
+    tokens: Iterable[Tuple[str, str]],
     constants: Dict[str, float],
     functions: Dict[str, Callable],
     precedence: Dict[str, int],
-    right_associative: set
+    right_associative: set,
+    number_type: Callable[[str], Any] = convert_number_literal
 ) -> Node:
     output_stack = []
     operator_stack = []
@@ -228,13 +1058,17 @@ def build_syntax_tree(
     
     for token_type, token_value in tokens:
         if token_type == 'NUMBER':
-            node = create_number_node(token_value)
+            node = create_number_node(token_value, number_type)
             output_stack.append(node)
         
         elif token_type == 'CONSTANT':
             node = create_constant_node(token_value, constants)
             output_stack.append(node)
         
+        elif token_type == 'VARIABLE':
+            node = create_variable_node(token_value)
+            output_stack.append(node)
+        
         elif token_type == 'FUNCTION':
             operator_stack.append(token_value)
         
@@ -288,97 +1122,1685 @@ def evaluate_number_node(node: Node) -> float:
 
     return node.value
 
-def evaluate_operator_node(
+def evaluate_variable_node(
     node: Node,
-    operations: Dict[str, Callable]
+    variables: Optional[Dict[str, float]]
 ) -> float:
-    left_value = evaluate_expression_tree(node.left, operations, functions)
-    right_value = evaluate_expression_tree(node.right, operations, functions)
+    if variables is None or node.value not in variables:
+        raise ValueError(f"Не задано значение переменной: {node.value}")
 
-    return operations[node.value](left_value, right_value)
+    return variables[node.value]
 
-def evaluate_function_node(
+def evaluate_expression_tree(
     node: Node,
-    functions: Dict[str, Callable]
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable],
+    variables: Optional[Dict[str, float]] = None
 ) -> float:
-    argument_value = evaluate_expression_tree(node.left, operations, functions)
+    values = []
+    pending = [(node, False)]
 
-    return functions[node.value](argument_value)
+    while pending:
+        current, expanded = pending.pop()
+        node_type = current.type
 
-def evaluate_unary_node(node: Node) -> float:
-    argument_value = evaluate_expression_tree(node.left, operations, functions)
+        if node_type == 'NUMBER':
+            values.append(0.0 if current.value is None else current.value)
+            continue
 
-    if node.value == "u-":
-        return -argument_value
+        if node_type == 'VARIABLE':
+            values.append(evaluate_variable_node(current, variables))
+            continue
 
-    return argument_value
+        if not expanded:
+            if node_type not in ('OPERATOR', 'FUNCTION', 'UNARY'):
+                raise ValueError(f"Неизвестный тип узла: {node_type}")
 
-def evaluate_expression_tree(
-    node: Node,
-    operations: Dict[str, Callable],
-    functions: Dict[str, Callable]
-) -> float:
-    if node.type == 'NUMBER':
-        return evaluate_number_node(node)
-    
-    if node.type == 'OPERATOR':
-        return evaluate_operator_node(node, operations)
-    
-    if node.type == 'FUNCTION':
-        return evaluate_function_node(node, functions)
-    
-    if node.type == 'UNARY':
-        return evaluate_unary_node(node)
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            pending.append((current.left, False))
+            continue
+
+        if node_type == 'OPERATOR':
+            right_value = values.pop()
+            values[-1] = operations[current.value](values[-1], right_value)
+        elif node_type == 'FUNCTION':
+            values[-1] = functions[current.value](values[-1])
+        elif current.value == "u-":
+            values[-1] = -values[-1]
+
+    return values[0]
+
+def measure_tree_depth(node: Node) -> int:
+    depth = 0
+    pending = [(node, 1)]
+
+    while pending:
+        current, level = pending.pop()
+
+        if current is None:
+            continue
+
+        depth = max(depth, level)
+        pending.append((current.left, level + 1))
+        pending.append((current.right, level + 1))
+
+    return depth
+
+def count_tree_nodes(node: Node) -> int:
+    count = 0
+    pending = [node]
+
+    while pending:
+        current = pending.pop()
+
+        if current is None:
+            continue
+
+        count += 1
+        pending.append(current.left)
+        pending.append(current.right)
+
+    return count
+
+def is_number_node(node: Node, value: Optional[float] = None) -> bool:
+    if node.type != 'NUMBER':
+        return False
+
+    return value is None or evaluate_number_node(node) == value
+
+def fold_constant(function: Callable, *arguments: float) -> Optional[Node]:
+    try:
+        return Node('NUMBER', function(*arguments))
+    except (ArithmeticError, ValueError):
+        return None
+
+def simplify_unary_node(operator: str, argument: Node) -> Node:
+    if operator == 'u+':
+        return argument
+
+    if argument.type == 'UNARY' and argument.value == 'u-':
+        return argument.left
+
+    if is_number_node(argument):
+        return Node('NUMBER', -evaluate_number_node(argument))
+
+    return create_unary_node(operator, argument)
+
+def simplify_function_node(
+    func_name: str,
+    argument: Node,
+    functions: Dict[str, Callable]
+) -> Node:
+    if is_number_node(argument):
+        folded = fold_constant(functions[func_name], evaluate_number_node(argument))
+        if folded is not None:
+            return folded
+
+    return create_function_node(func_name, argument)
+
+def simplify_operator_node(
+    operator: str,
+    left: Node,
+    right: Node,
+    operations: Dict[str, Callable]
+) -> Node:
+    if is_number_node(left) and is_number_node(right):
+        folded = fold_constant(
+            operations[operator],
+            evaluate_number_node(left), evaluate_number_node(right)
+        )
+        if folded is not None:
+            return folded
+
+    if operator in ('*', '/', '^') and is_number_node(right, 1):
+        return left
+
+    if operator == '*' and is_number_node(left, 1):
+        return right
+
+    if operator == '-' and is_number_node(right, 0):
+        return left
+
+    return create_operator_node(operator, left, right)
+
+def optimize_tree(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> Tuple[Node, int]:
+    optimized = {}
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+
+        if id(current) in optimized:
+            continue
+
+        if current.type in ('NUMBER', 'VARIABLE'):
+            optimized[id(current)] = current
+            continue
+
+        if not expanded:
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            pending.append((current.left, False))
+            continue
+
+        left = optimized[id(current.left)]
+
+        if current.type == 'UNARY':
+            result = simplify_unary_node(current.value, left)
+        elif current.type == 'FUNCTION':
+            result = simplify_function_node(current.value, left, functions)
+        elif current.type == 'OPERATOR':
+            right = optimized[id(current.right)]
+            result = simplify_operator_node(current.value, left, right, operations)
+        else:
+            raise ValueError(f"Неизвестный тип узла: {current.type}")
+
+        optimized[id(current)] = result
+
+    result = optimized[id(node)]
+
+    return result, count_tree_nodes(node) - count_tree_nodes(result)
+
+def build_expression_dag(node: Node) -> Node:
+    unique_nodes = {}
+    shared = {}
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+
+        if id(current) in shared:
+            continue
+
+        if not expanded:
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            if current.left is not None:
+                pending.append((current.left, False))
+            continue
+
+        left = None if current.left is None else shared[id(current.left)]
+        right = None if current.right is None else shared[id(current.right)]
+        key = (
+            current.type, type(current.value), repr(current.value),
+            id(left), id(right)
+        )
+
+        if key not in unique_nodes:
+            unique_nodes[key] = Node(current.type, current.value, left, right)
+
+        shared[id(current)] = unique_nodes[key]
+
+    return shared[id(node)]
+
+def dag_statistics(node: Node) -> Dict[str, float]:
+    tree_sizes = {}
+    parent_counts = {}
+    internal_nodes = set()
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+
+        if id(current) in tree_sizes:
+            continue
+
+        if not expanded:
+            pending.append((current, True))
+            if current.left is not None:
+                internal_nodes.add(id(current))
+            for child in (current.right, current.left):
+                if child is not None:
+                    parent_counts[id(child)] = parent_counts.get(id(child), 0) + 1
+                    pending.append((child, False))
+            continue
+
+        size = 1
+        for child in (current.left, current.right):
+            if child is not None:
+                size += tree_sizes[id(child)]
+        tree_sizes[id(current)] = size
+
+    shared_nodes = sum(
+        1 for node_id, count in parent_counts.items()
+        if count > 1 and node_id in internal_nodes
+    )
+
+    tree_nodes = tree_sizes[id(node)]
+    dag_nodes = len(tree_sizes)
+
+    return {
+        'tree_nodes': tree_nodes,
+        'dag_nodes': dag_nodes,
+        'shared_nodes': shared_nodes,
+        'ratio': tree_nodes / dag_nodes
+    }
+
+def compile_number_node(node: Node) -> Callable[[Dict[str, float]], float]:
+    value = evaluate_number_node(node)
+
+    return lambda variables: value
+
+def compile_variable_node(node: Node) -> Callable[[Dict[str, float]], float]:
+    name = node.value
+
+    def read_variable(variables: Dict[str, float]) -> float:
+        try:
+            return variables[name]
+        except KeyError:
+            raise ValueError(f"Не задано значение переменной: {name}") from None
+
+    return read_variable
+
+def compile_operator_node(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> Callable[[Dict[str, float]], float]:
+    operation = operations[node.value]
+    left = compile_node(node.left, operations, functions)
+    right = compile_node(node.right, operations, functions)
+
+    return lambda variables: operation(left(variables), right(variables))
+
+def compile_function_node(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> Callable[[Dict[str, float]], float]:
+    function = functions[node.value]
+    argument = compile_node(node.left, operations, functions)
+
+    return lambda variables: function(argument(variables))
+
+def compile_unary_node(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> Callable[[Dict[str, float]], float]:
+    argument = compile_node(node.left, operations, functions)
+
+    if node.value == "u-":
+        return lambda variables: -argument(variables)
+
+    return argument
+
+def compile_node(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> Callable[[Dict[str, float]], float]:
+    if node.type == 'NUMBER':
+        return compile_number_node(node)
+    
+    if node.type == 'VARIABLE':
+        return compile_variable_node(node)
+    
+    if node.type == 'OPERATOR':
+        return compile_operator_node(node, operations, functions)
+    
+    if node.type == 'FUNCTION':
+        return compile_function_node(node, operations, functions)
+    
+    if node.type == 'UNARY':
+        return compile_unary_node(node, operations, functions)
     
     raise ValueError(f"Неизвестный тип узла: {node.type}")
 
-def print_number_node(node: Node, indent: str) -> None:
-    print(f"{indent}NUMBER: {node.value}")
+MAX_COMPILED_DEPTH = 256
+
+def compile_expression_tree(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable],
+    optimize: bool = True,
+    deduplicate: bool = True
+) -> Callable[[Dict[str, float]], float]:
+    if optimize:
+        node, _ = optimize_tree(node, operations, functions)
+
+    if deduplicate:
+        dag = build_expression_dag(node)
+
+        if dag_statistics(dag)['shared_nodes'] > 0:
+            flat = flatten_tree(dag)
+            return lambda variables: evaluate_flat_tree(
+                flat, operations, functions, variables
+            )
+
+    if measure_tree_depth(node) > MAX_COMPILED_DEPTH:
+        return lambda variables: evaluate_expression_tree(
+            node, operations, functions, variables
+        )
+
+    return compile_node(node, operations, functions)
+
+def flatten_tree(node: Node) -> FlatTree:
+    flat = FlatTree()
+    pool_indexes = {}
+    node_indexes = {}
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+
+        if id(current) in node_indexes:
+            continue
+
+        if not expanded:
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            if current.left is not None:
+                pending.append((current.left, False))
+            continue
+
+        if current.type not in NODE_OPCODES:
+            raise ValueError(f"Неизвестный тип узла: {current.type}")
+
+        value_key = (type(current.value), repr(current.value))
+        if value_key not in pool_indexes:
+            pool_indexes[value_key] = len(flat.pool)
+            flat.pool.append(current.value)
+
+        node_indexes[id(current)] = len(flat.opcodes)
+        flat.opcodes.append(NODE_OPCODES[current.type])
+        flat.operands.append(pool_indexes[value_key])
+        flat.lefts.append(-1 if current.left is None else node_indexes[id(current.left)])
+        flat.rights.append(-1 if current.right is None else node_indexes[id(current.right)])
+
+    return flat
+
+def expand_flat_tree(flat: FlatTree) -> Node:
+    nodes = []
+
+    for index, opcode in enumerate(flat.opcodes):
+        left_index = flat.lefts[index]
+        right_index = flat.rights[index]
+
+        nodes.append(Node(
+            NODE_TYPES[opcode],
+            flat.pool[flat.operands[index]],
+            None if left_index < 0 else nodes[left_index],
+            None if right_index < 0 else nodes[right_index]
+        ))
+
+    return nodes[-1]
+
+def evaluate_flat_tree(
+    flat: FlatTree,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable],
+    variables: Optional[Dict[str, float]] = None
+) -> float:
+    pool = flat.pool
+    lefts = flat.lefts
+    rights = flat.rights
+    values = []
+
+    for index, opcode in enumerate(flat.opcodes):
+        value = pool[flat.operands[index]]
+
+        if opcode == 0:
+            values.append(0.0 if value is None else value)
+        elif opcode == 1:
+            if variables is None or value not in variables:
+                raise ValueError(f"Не задано значение переменной: {value}")
+            values.append(variables[value])
+        elif opcode == 2:
+            values.append(operations[value](values[lefts[index]], values[rights[index]]))
+        elif opcode == 3:
+            values.append(functions[value](values[lefts[index]]))
+        elif value == "u-":
+            values.append(-values[lefts[index]])
+        else:
+            values.append(values[lefts[index]])
+
+    return values[-1]
+
+def measure_flat_tree_memory(flat: FlatTree) -> int:
+    size = sys.getsizeof(flat) + sys.getsizeof(flat.pool)
+
+    for column in (flat.opcodes, flat.operands, flat.lefts, flat.rights):
+        size += sys.getsizeof(column)
+
+    for value in flat.pool:
+        size += sys.getsizeof(value)
+
+    return size
+
+def measure_tree_memory(node: Node) -> int:
+    size = 0
+    seen_values = set()
+    pending = [node]
+
+    while pending:
+        current = pending.pop()
+
+        if current is None:
+            continue
+
+        size += sys.getsizeof(current)
+        if id(current.value) not in seen_values:
+            seen_values.add(id(current.value))
+            size += sys.getsizeof(current.value)
+
+        pending.append(current.left)
+        pending.append(current.right)
+
+    return size
+
+def emit_instruction(
+    bytecode: Bytecode,
+    opcode: int,
+    value: Any,
+    pool: List[Any],
+    pool_indexes: Dict[tuple, int]
+) -> None:
+    key = (opcode == BYTECODE_PUSH, type(value), repr(value))
+
+    if key not in pool_indexes:
+        pool_indexes[key] = len(pool)
+        pool.append(value)
+
+    bytecode.opcodes.append(opcode)
+    bytecode.arguments.append(pool_indexes[key])
+
+def compile_to_bytecode(
+    node: Node,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable],
+    optimize: bool = True
+) -> Bytecode:
+    if optimize:
+        node, _ = optimize_tree(node, operations, functions)
+
+    bytecode = Bytecode()
+    pool_indexes = {}
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+        node_type = current.type
+
+        if node_type == 'NUMBER':
+            emit_instruction(
+                bytecode, BYTECODE_PUSH, evaluate_number_node(current),
+                bytecode.constants, pool_indexes
+            )
+            continue
+
+        if node_type == 'VARIABLE':
+            emit_instruction(
+                bytecode, BYTECODE_LOAD, current.value, bytecode.names, pool_indexes
+            )
+            continue
+
+        if not expanded:
+            if node_type not in ('OPERATOR', 'FUNCTION', 'UNARY'):
+                raise ValueError(f"Неизвестный тип узла: {node_type}")
+
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            pending.append((current.left, False))
+            continue
+
+        if node_type == 'OPERATOR':
+            emit_instruction(
+                bytecode, BYTECODE_BINARY, current.value, bytecode.names, pool_indexes
+            )
+        elif node_type == 'FUNCTION':
+            emit_instruction(
+                bytecode, BYTECODE_CALL, current.value, bytecode.names, pool_indexes
+            )
+        elif current.value == 'u-':
+            bytecode.opcodes.append(BYTECODE_NEGATE)
+            bytecode.arguments.append(0)
+
+    return bytecode
+
+def link_bytecode(
+    bytecode: Bytecode,
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> List[Tuple[int, Any]]:
+    program = []
+
+    for opcode, argument in zip(bytecode.opcodes, bytecode.arguments):
+        if opcode == BYTECODE_PUSH:
+            program.append((opcode, bytecode.constants[argument]))
+        elif opcode == BYTECODE_BINARY:
+            program.append((opcode, operations[bytecode.names[argument]]))
+        elif opcode == BYTECODE_CALL:
+            name = bytecode.names[argument]
+            if name not in functions:
+                raise ValueError(f"Неизвестная функция: {name}")
+            program.append((opcode, functions[name]))
+        elif opcode == BYTECODE_NEGATE:
+            program.append((opcode, None))
+        elif opcode == BYTECODE_LOAD:
+            program.append((opcode, bytecode.names[argument]))
+        else:
+            raise ValueError(f"Неизвестная инструкция: {opcode}")
+
+    return program
+
+def execute_program(
+    program: List[Tuple[int, Any]],
+    variables: Optional[Dict[str, float]] = None
+) -> float:
+    stack = []
+    push = stack.append
+    pop = stack.pop
+
+    for opcode, argument in program:
+        if opcode == 0:
+            push(argument)
+        elif opcode == 1:
+            right_value = pop()
+            stack[-1] = argument(stack[-1], right_value)
+        elif opcode == 2:
+            stack[-1] = argument(stack[-1])
+        elif opcode == 3:
+            stack[-1] = -stack[-1]
+        elif variables is not None and argument in variables:
+            push(variables[argument])
+        else:
+            raise ValueError(f"Не задано значение переменной: {argument}")
+
+    return stack[0]
+
+def pack_text_constant(tag: bytes, text: str) -> bytes:
+    encoded = text.encode('ascii')
+
+    return tag + struct.pack('<I', len(encoded)) + encoded
+
+def pack_constant(value: Any) -> bytes:
+    if type(value) is float:
+        return b'd' + struct.pack('<d', value)
+
+    if type(value) is complex:
+        return b'c' + struct.pack('<dd', value.real, value.imag)
+
+    if type(value) is int:
+        return pack_text_constant(b'i', str(value))
+
+    from decimal import Decimal
+    from fractions import Fraction
+
+    if type(value) is Fraction:
+        return pack_text_constant(b'f', f"{value.numerator}/{value.denominator}")
+
+    if type(value) is Decimal:
+        return pack_text_constant(b'm', str(value))
+
+    raise ValueError(f"Константа не поддерживает сериализацию: {value!r}")
+
+def unpack_constant(data: memoryview, offset: int) -> Tuple[Any, int]:
+    tag = bytes(data[offset:offset + 1])
+
+    if tag == b'd':
+        return struct.unpack_from('<d', data, offset + 1)[0], offset + 9
+
+    if tag == b'c':
+        real, imag = struct.unpack_from('<dd', data, offset + 1)
+        return complex(real, imag), offset + 17
+
+    if tag in (b'i', b'f', b'm'):
+        length, = struct.unpack_from('<I', data, offset + 1)
+        start = offset + 5
+        text = bytes(data[start:start + length]).decode('ascii')
+
+        if tag == b'i':
+            return int(text), start + length
+
+        from decimal import Decimal
+        from fractions import Fraction
+
+        number_type = Fraction if tag == b'f' else Decimal
+
+        return number_type(text), start + length
+
+    raise ValueError("Повреждённый байт-код")
+
+def bytecode_to_bytes(bytecode: Bytecode) -> bytes:
+    arguments = array('I', bytecode.arguments)
+    if sys.byteorder == 'big':
+        arguments.byteswap()
+
+    names = '\0'.join(bytecode.names).encode('utf-8')
+    constants = b''.join(pack_constant(value) for value in bytecode.constants)
+
+    return b''.join((
+        BYTECODE_MAGIC,
+        struct.pack(
+            '<BIIII', BYTECODE_VERSION, len(bytecode.opcodes),
+            len(bytecode.constants), len(bytecode.names), len(names)
+        ),
+        bytecode.opcodes.tobytes(),
+        arguments.tobytes(),
+        names,
+        constants
+    ))
+
+def bytecode_from_bytes(data: Union[bytes, memoryview]) -> Bytecode:
+    data = memoryview(data)
+
+    if bytes(data[:4]) != BYTECODE_MAGIC:
+        raise ValueError("Повреждённый байт-код")
+
+    version, instruction_count, constant_count, name_count, names_size = (
+        struct.unpack_from('<BIIII', data, 4)
+    )
+    if version != BYTECODE_VERSION:
+        raise ValueError(f"Неподдерживаемая версия байт-кода: {version}")
+
+    bytecode = Bytecode()
+    offset = 4 + struct.calcsize('<BIIII')
+
+    bytecode.opcodes.frombytes(data[offset:offset + instruction_count])
+    offset += instruction_count
+
+    arguments_size = instruction_count * bytecode.arguments.itemsize
+    bytecode.arguments.frombytes(data[offset:offset + arguments_size])
+    if sys.byteorder == 'big':
+        bytecode.arguments.byteswap()
+    offset += arguments_size
+
+    if name_count:
+        bytecode.names = bytes(data[offset:offset + names_size]).decode('utf-8').split('\0')
+    offset += names_size
+
+    for _ in range(constant_count):
+        value, offset = unpack_constant(data, offset)
+        bytecode.constants.append(value)
+
+    return bytecode
+
+def hash_expression(expression: str) -> bytes:
+    import hashlib
+
+    return hashlib.sha256(expression.encode('utf-8')).digest()
+
+def describe_code(code: Any) -> str:
+    constants = [
+        describe_code(constant) if hasattr(constant, 'co_code') else repr(constant)
+        for constant in code.co_consts
+    ]
+
+    return f"{code.co_code.hex()}:{constants}:{code.co_names}"
+
+def describe_callable(function: Callable, seen: Optional[set] = None) -> str:
+    while hasattr(function, '__wrapped__'):
+        function = function.__wrapped__
+
+    seen = set() if seen is None else seen
+    if id(function) in seen:
+        return '<recursive>'
+    seen.add(id(function))
+
+    module = getattr(function, '__module__', None) or ''
+    name = getattr(function, '__qualname__', None) or type(function).__qualname__
+    parts = [f"{module}.{name}"]
+
+    code = getattr(function, '__code__', None)
+    if code is not None:
+        parts.append(describe_code(code))
+
+        for cell in getattr(function, '__closure__', None) or ():
+            try:
+                value = cell.cell_contents
+            except ValueError:
+                continue
+            parts.append(describe_callable(value, seen) if callable(value) else repr(value))
+
+    inner = getattr(function, 'func', None)
+    if callable(inner):
+        parts.append(describe_callable(inner, seen))
+        parts.append(repr(getattr(function, 'args', ())))
+        parts.append(repr(getattr(function, 'keywords', {})))
+
+    owner = getattr(function, '__self__', None)
+    if owner is not None and not isinstance(owner, type(math)):
+        parts.append(repr(owner))
+
+    return '|'.join(parts)
+
+def create_grammar_fingerprint(
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set,
+    backend: str = 'float'
+) -> str:
+    import json
+    import hashlib
+
+    description = json.dumps({
+        'bytecode': BYTECODE_VERSION,
+        'cache': DISK_CACHE_HEADER.decode('ascii'),
+        'patterns': [(pattern.pattern, token_type) for pattern, token_type in patterns],
+        'constants': sorted((name, repr(value)) for name, value in constants.items()),
+        'functions': sorted(
+            (name, describe_callable(function)) for name, function in functions.items()
+        ),
+        'operations': sorted(
+            (name, describe_callable(operation)) for name, operation in operations.items()
+        ),
+        'precedence': sorted(precedence.items()),
+        'right_associative': sorted(right_associative),
+        'backend': backend
+    })
+
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()[:32]
+
+def load_compiled_expressions(
+    expressions: Iterable[str],
+    disk_cache: DiskCache,
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set
+) -> List[List[Tuple[int, Any]]]:
+    programs = []
+
+    for expression in expressions:
+        bytecode = disk_cache.get(expression)
+
+        if bytecode is None:
+            tokens = tokenize_expression(expression, patterns)
+            tree = build_syntax_tree(
+                tokens, constants, functions,
+                precedence, right_associative
+            )
+            bytecode = compile_to_bytecode(tree, operations, functions)
+            disk_cache.put(expression, bytecode)
+
+        programs.append(link_bytecode(bytecode, operations, functions))
+
+    return programs
+
+def collect_variable_names(node: Node) -> List[str]:
+    names = []
+    pending = [node]
+
+    while pending:
+        current = pending.pop()
+
+        if current is None:
+            continue
+
+        if current.type == 'VARIABLE' and current.value not in names:
+            names.append(current.value)
+
+        pending.append(current.right)
+        pending.append(current.left)
+
+    return names
+
+def evaluate_many(
+    tree: Node,
+    bindings: Dict[str, Sequence[float]],
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable],
+    run: Optional[Callable] = None
+) -> List[float]:
+    names = collect_variable_names(tree)
+    missing = [name for name in names if name not in bindings]
+
+    if missing:
+        raise ValueError(f"Не заданы значения переменных: {', '.join(missing)}")
+
+    lengths = {len(column) for column in bindings.values()}
+    if len(lengths) > 1:
+        raise ValueError("Столбцы значений переменных имеют разную длину")
+
+    row_count = lengths.pop() if lengths else 1
+    compiled = compile_expression_tree(tree, operations, functions)
+
+    if run is None:
+        run = lambda function, *arguments: function(*arguments)
+
+    if not names:
+        value = run(compiled, {})
+        return [value] * row_count
+
+    columns = [bindings[name] for name in names]
+    variables = {}
+    results = []
+
+    for row in zip(*columns):
+        variables.update(zip(names, row))
+        results.append(run(compiled, variables))
+
+    return results
+
+def require_numpy() -> None:
+    global np
+
+    if np is not None:
+        return
+
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("Для векторного вычисления требуется NumPy") from None
+
+    np = numpy
+
+def vectorized_divide(a, b):
+    return np.divide(a, b, out=np.full(np.broadcast(a, b).shape, np.inf), where=b != 0)
+
+def vectorized_power(a, b):
+    a, b = np.broadcast_arrays(a, b)
+
+    if np.any((a == 0) & (b < 0)):
+        raise ZeroDivisionError("0.0 cannot be raised to a negative power")
+
+    if np.any((a < 0) & np.isfinite(b) & (b != np.trunc(b))):
+        raise ValueError("Комплексный результат не поддерживается при векторном вычислении")
+
+    result = np.power(a, b)
+
+    if np.any(np.isinf(result) & np.isfinite(a) & np.isfinite(b)):
+        raise OverflowError("Numerical result out of range")
+
+    return result
+
+def vectorized_trigonometric(function: Callable) -> Callable:
+    def apply(x):
+        if np.any(np.isinf(x)):
+            raise ValueError("math domain error")
+
+        return function(x)
+
+    return apply
+
+def vectorized_sqrt(x):
+    return np.sqrt(x, out=np.full(np.shape(x), np.nan), where=x >= 0)
+
+def vectorized_log(x):
+    if np.any(x <= 0):
+        raise ValueError("math domain error")
+
+    return np.log(x)
+
+def vectorized_exp(x):
+    result = np.exp(x)
+
+    if np.any(np.isinf(result) & np.isfinite(x)):
+        raise OverflowError("math range error")
+
+    return result
+
+def create_vectorized_operations_map() -> Dict[str, Callable]:
+    require_numpy()
+
+    return {
+        '+': np.add,
+        '-': np.subtract,
+        '*': np.multiply,
+        '/': vectorized_divide,
+        '^': vectorized_power
+    }
+
+def create_vectorized_functions_map() -> Dict[str, Callable]:
+    require_numpy()
+
+    return {
+        'sin': vectorized_trigonometric(np.sin),
+        'cos': vectorized_trigonometric(np.cos),
+        'tan': vectorized_trigonometric(np.tan),
+        'sqrt': vectorized_sqrt,
+        'log': vectorized_log,
+        'exp': vectorized_exp,
+        'abs': np.abs
+    }
+
+def evaluate_vectorized_tree(
+    node: Node,
+    columns: Dict[str, 'np.ndarray'],
+    operations: Dict[str, Callable],
+    functions: Dict[str, Callable]
+) -> 'np.ndarray':
+    values = []
+    pending = [(node, False)]
+
+    while pending:
+        current, expanded = pending.pop()
+        node_type = current.type
+
+        if node_type == 'NUMBER':
+            values.append(np.float64(convert_to_float(evaluate_number_node(current))))
+            continue
+
+        if node_type == 'VARIABLE':
+            values.append(columns[current.value])
+            continue
+
+        if not expanded:
+            if node_type not in ('OPERATOR', 'FUNCTION', 'UNARY'):
+                raise ValueError(f"Неизвестный тип узла: {node_type}")
+
+            pending.append((current, True))
+            if current.right is not None:
+                pending.append((current.right, False))
+            pending.append((current.left, False))
+            continue
+
+        if node_type == 'OPERATOR':
+            right_value = values.pop()
+            values[-1] = operations[current.value](values[-1], right_value)
+        elif node_type == 'FUNCTION':
+            values[-1] = functions[current.value](values[-1])
+        elif current.value == "u-":
+            values[-1] = np.negative(values[-1])
+
+    return values[0]
+
+def evaluate_vectorized(
+    tree: Node,
+    bindings: Dict[str, Sequence[float]],
+    operations: Optional[Dict[str, Callable]] = None,
+    functions: Optional[Dict[str, Callable]] = None
+) -> 'np.ndarray':
+    require_numpy()
+
+    if operations is None:
+        operations = create_vectorized_operations_map()
+
+    if functions is None:
+        functions = create_vectorized_functions_map()
+
+    names = collect_variable_names(tree)
+    missing = [name for name in names if name not in bindings]
+
+    if missing:
+        raise ValueError(f"Не заданы значения переменных: {', '.join(missing)}")
+
+    columns = {
+        name: np.asarray(column, dtype=np.float64)
+        for name, column in bindings.items()
+    }
+    lengths = {len(column) for column in columns.values()}
+
+    if len(lengths) > 1:
+        raise ValueError("Столбцы значений переменных имеют разную длину")
+
+    row_count = lengths.pop() if lengths else 1
+
+    with np.errstate(all='ignore'):
+        result = evaluate_vectorized_tree(tree, columns, operations, functions)
+
+    return np.broadcast_to(result, (row_count,)).copy()
+
+def print_number_node(node: Node, indent: str) -> None:
+    print(f"{indent}NUMBER: {node.value}")
+
+def print_variable_node(node: Node, indent: str) -> None:
+    print(f"{indent}VARIABLE: {node.value}")
+
+def print_function_node(node: Node, indent: str) -> None:
+    print(f"{indent}FUNCTION: {node.value}")
+    print_tree_structure(node.left, len(indent) + 2)
+
+def print_unary_node(node: Node, indent: str) -> None:
+    print(f"{indent}UNARY: {node.value}")
+    print_tree_structure(node.left, len(indent) + 2)
+
+def print_operator_node(node: Node, indent: str) -> None:
+    print(f"{indent}OPERATOR: {node.value}")
+    print_tree_structure(node.left, len(indent) + 2)
+    print_tree_structure(node.right, len(indent) + 2)
+
+def print_tree_structure(node: Node, level: int = 0) -> None:
+    indent = " " * level
+    
+    if node.type == 'NUMBER':
+        return print_number_node(node, indent)
+    
+    if node.type == 'VARIABLE':
+        return print_variable_node(node, indent)
+    
+    if node.type == 'FUNCTION':
+        return print_function_node(node, indent)
+    
+    if node.type == 'UNARY':
+        return print_unary_node(node, indent)
+    
+    return print_operator_node(node, indent)
+
+def calculate_expression(
+    expression: str,
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set,
+    cache: Optional[ParseCache] = None,
+    profiler: Optional[Callable[[Dict[str, Any]], None]] = None,
+    number_type: Callable[[str], Any] = convert_number_literal
+) -> float:
+    if profiler is not None:
+        return calculate_expression_profiled(
+            expression, patterns, constants, functions, operations,
+            precedence, right_associative, cache, profiler, number_type
+        )
+
+    if cache is not None:
+        compiled = cache.get(expression)
+
+        if compiled is not None:
+            return compiled({})
+
+    tokens = tokenize_expression(expression, patterns)
+    
+    tree = build_syntax_tree(
+        tokens, constants, functions,
+        precedence, right_associative, number_type
+    )
+
+    if cache is None:
+        return evaluate_expression_tree(tree, operations, functions)
+
+    compiled = compile_expression_tree(tree, operations, functions)
+    cache.put(expression, compiled)
+
+    return compiled({})
+
+def calculate_expression_profiled(
+    expression: str,
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set,
+    cache: Optional[ParseCache],
+    profiler: Callable[[Dict[str, Any]], None],
+    number_type: Callable[[str], Any] = convert_number_literal,
+    variables: Optional[Dict[str, float]] = None,
+    guard: Optional[ResourceGuard] = None
+) -> float:
+    record = {'expression_length': len(expression), 'cached': False}
+    started = time.perf_counter()
+
+    try:
+        compiled = None if cache is None else cache.get(expression)
+
+        if compiled is not None:
+            record['cached'] = True
+        else:
+            stage_started = time.perf_counter()
+            tokens = tokenize_expression(expression, patterns, guard)
+            record['tokenize_seconds'] = time.perf_counter() - stage_started
+            record['tokens'] = len(tokens)
+
+            stage_started = time.perf_counter()
+            tree = build_syntax_tree(
+                tokens, constants, functions,
+                precedence, right_associative, number_type
+            )
+            record['parse_seconds'] = time.perf_counter() - stage_started
+            record['nodes'] = count_tree_nodes(tree)
+            record['depth'] = measure_tree_depth(tree)
+
+            if guard is not None:
+                guard.check_depth(tree)
+
+            if cache is not None:
+                stage_started = time.perf_counter()
+                compiled = compile_expression_tree(tree, operations, functions)
+                record['compile_seconds'] = time.perf_counter() - stage_started
+                cache.put(expression, compiled)
+
+        stage_started = time.perf_counter()
+        if compiled is None:
+            result = evaluate_expression_tree(tree, operations, functions, variables)
+        else:
+            result = compiled({} if variables is None else variables)
+        record['evaluate_seconds'] = time.perf_counter() - stage_started
+
+        return result
+    except Exception as error:
+        record['error'] = f"{type(error).__name__}: {error}"
+        raise
+    finally:
+        record['total_seconds'] = time.perf_counter() - started
+        profiler(record)
+
+class Calculator:
+    def __init__(
+        self,
+        constants: Optional[Dict[str, float]] = None,
+        functions: Optional[Dict[str, Callable]] = None,
+        operations: Optional[Dict[str, Callable]] = None,
+        cache_size: int = 4096,
+        disk_cache_directory: Optional[str] = None,
+        profiler: Optional[Callable[[Dict[str, Any]], None]] = None,
+        backend: Union[str, NumericBackend] = 'float',
+        precision: Optional[int] = None,
+        limits: Optional[ResourceLimits] = None
+    ):
+        if isinstance(backend, str):
+            backend = create_numeric_backend(backend, precision)
+
+        self.backend = backend
+        self.constants = dict(backend.constants) if constants is None else dict(constants)
+        self.functions = dict(backend.functions) if functions is None else dict(functions)
+        self.operations = dict(backend.operations)
+
+        if operations is not None:
+            unknown = set(operations) - set(self.operations)
+            if unknown:
+                raise ValueError(f"Неизвестные операторы: {', '.join(sorted(unknown))}")
+            self.operations.update(operations)
+
+        self.guard = None
+        self.number_type = backend.number_type
+        if limits is not None:
+            self.guard = ResourceGuard(limits)
+            self.operations = self.guard.wrap_operations(self.operations)
+            self.functions = self.guard.wrap_functions(self.functions)
+            self.number_type = self.guard.wrap_function(self.number_type)
+
+        self.precedence = create_precedence_map()
+        self.right_associative = create_right_associative_set()
+        self.patterns = get_compiled_patterns(self.functions, self.constants)
+        self.master_pattern, self.group_types = combine_compiled_patterns(self.patterns)
+        self.cache = ParseCache(cache_size)
+        self.profiler = profiler
+        self.disk_cache = None
+
+        if disk_cache_directory is not None:
+            self.disk_cache = DiskCache(disk_cache_directory, self.fingerprint())
+
+    def fingerprint(self) -> str:
+        return create_grammar_fingerprint(
+            self.patterns, self.constants, self.functions,
+            self.operations, self.precedence, self.right_associative,
+            self.backend.describe()
+        )
+
+    def tokenize(self, expression: str) -> List[Tuple[str, str]]:
+        return tokenize_expression(expression, self.patterns, self.guard)
+
+    def parse(self, expression: str) -> Node:
+        tree = build_syntax_tree(
+            self.tokenize(expression), self.constants, self.functions,
+            self.precedence, self.right_associative, self.number_type
+        )
+
+        if self.guard is not None:
+            self.guard.check_depth(tree)
+
+        return tree
+
+    def parse_stream(
+        self,
+        source: Union[str, TextIO, Iterable[str]],
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Node:
+        tokens = iterate_tokens(source, self.master_pattern, self.group_types, chunk_size)
+
+        if self.guard is not None:
+            tokens = self.guard.limit_tokens(tokens)
+
+        tree = build_syntax_tree(
+            tokens, self.constants, self.functions, self.precedence,
+            self.right_associative, self.number_type
+        )
+
+        if self.guard is not None:
+            self.guard.check_depth(tree)
+
+        return tree
+
+    def calculate_stream(
+        self,
+        source: Union[str, TextIO, Iterable[str]],
+        variables: Optional[Dict[str, float]] = None,
+        chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> float:
+        return self.evaluate(self.parse_stream(source, chunk_size), variables)
+
+    def compile(self, expression: str) -> Callable[[Dict[str, float]], float]:
+        compiled = self.cache.get(expression)
+
+        if compiled is None:
+            tree = self.parse(expression)
+
+            with self.backend.activate():
+                compiled = compile_expression_tree(tree, self.operations, self.functions)
+
+            self.cache.put(expression, compiled)
+
+        return compiled
+
+    def compile_program(self, expression: str) -> List[Tuple[int, Any]]:
+        bytecode = None if self.disk_cache is None else self.disk_cache.get(expression)
+
+        if bytecode is None:
+            tree = self.parse(expression)
+
+            with self.backend.activate():
+                bytecode = compile_to_bytecode(tree, self.operations, self.functions)
+
+            if self.disk_cache is not None:
+                self.disk_cache.put(expression, bytecode)
+
+        return link_bytecode(bytecode, self.operations, self.functions)
+
+    def calculate(
+        self,
+        expression: str,
+        variables: Optional[Dict[str, float]] = None
+    ) -> float:
+        if self.guard is None and self.backend.context is None:
+            return self.calculate_in_context(expression, variables)
+
+        if self.guard is not None:
+            self.guard.check_variables(variables)
+
+        return self.run_in_context(self.calculate_in_context, expression, variables)
+
+    def run_in_context(self, function: Callable, *arguments: Any) -> Any:
+        with self.backend.activate():
+            if self.guard is None:
+                return function(*arguments)
+
+            return self.guard.run(function, *arguments)
+
+    def calculate_in_context(
+        self,
+        expression: str,
+        variables: Optional[Dict[str, float]] = None
+    ) -> float:
+        if self.profiler is not None:
+            return calculate_expression_profiled(
+                expression, self.patterns, self.constants, self.functions,
+                self.operations, self.precedence, self.right_associative,
+                self.cache, self.profiler, self.number_type, variables, self.guard
+            )
+
+        return self.compile(expression)({} if variables is None else variables)
+
+    def evaluate(
+        self,
+        tree: Node,
+        variables: Optional[Dict[str, float]] = None
+    ) -> float:
+        if self.guard is not None:
+            self.guard.check_variables(variables)
+
+        return self.run_in_context(
+            evaluate_expression_tree, tree, self.operations, self.functions, variables
+        )
+
+    def evaluate_many(
+        self,
+        expression: Union[str, Node],
+        bindings: Dict[str, Sequence[float]]
+    ) -> List[float]:
+        tree = self.parse(expression) if isinstance(expression, str) else expression
+
+        run = None
+
+        if self.guard is not None:
+            self.guard.check_bindings(bindings)
+            run = self.guard.run
 
-def print_function_node(node: Node, indent: str) -> None:
-    print(f"{indent}FUNCTION: {node.value}")
-    print_tree_structure(node.left, len(indent) + 2)
+        with self.backend.activate():
+            return evaluate_many(tree, bindings, self.operations, self.functions, run)
 
-def print_unary_node(node: Node, indent: str) -> None:
-    print(f"{indent}UNARY: {node.value}")
-    print_tree_structure(node.left, len(indent) + 2)
+    def invalidate(self) -> None:
+        self.cache.invalidate()
 
-def print_operator_node(node: Node, indent: str) -> None:
-    print(f"{indent}OPERATOR: {node.value}")
-    print_tree_structure(node.left, len(indent) + 2)
-    print_tree_structure(node.right, len(indent) + 2)
+    def close(self) -> None:
+        if self.disk_cache is not None:
+            self.disk_cache.close()
 
-def print_tree_structure(node: Node, level: int = 0) -> None:
-    indent = " " * level
-    
-    if node.type == 'NUMBER':
-        return print_number_node(node, indent)
-    
-    if node.type == 'FUNCTION':
-        return print_function_node(node, indent)
-    
-    if node.type == 'UNARY':
-        return print_unary_node(node, indent)
-    
-    return print_operator_node(node, indent)
+_default_calculator: Optional[Calculator] = None
+_default_calculator_lock = threading.Lock()
 
-def calculate_expression(
-    expression: str,
-    patterns: List[Tuple[re.Pattern, Optional[str]]],
-    constants: Dict[str, float],
-    functions: Dict[str, Callable],
+def get_default_calculator() -> Calculator:
+    global _default_calculator
+
+    if _default_calculator is None:
+        with _default_calculator_lock:
+            if _default_calculator is None:
+                _default_calculator = Calculator()
+
+    return _default_calculator
+
+def calc(expression: str) -> float:
+    return get_default_calculator().calculate(expression)
+
+_worker_calculator: Optional[Calculator] = None
+
+def initialize_worker(cache_size: int = 4096, limits: Optional[ResourceLimits] = None) -> None:
+    global _worker_calculator
+    _worker_calculator = Calculator(cache_size=cache_size, limits=limits)
+
+def evaluate_chunk(expressions: List[str]) -> List[Union[float, Exception]]:
+    return calculate_chunk(_worker_calculator, expressions)
+
+def calculate_chunk(
+    calculator: Calculator,
+    expressions: List[str]
+) -> List[Union[float, Exception]]:
+    results = []
+
+    for expression in expressions:
+        try:
+            results.append(calculator.calculate(expression))
+        except Exception as error:
+            results.append(error)
+
+    return results
+
+def split_into_chunks(items: Iterable[str], chunksize: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+
+    while True:
+        chunk = list(islice(iterator, chunksize))
+
+        if not chunk:
+            return
+
+        yield chunk
+
+def calculate_many(
+    expressions: Iterable[str],
+    workers: Optional[int] = None,
+    chunksize: int = 256,
+    cache_size: int = 4096,
+    executor: str = 'process'
+) -> List[Union[float, Exception]]:
+    if chunksize < 1:
+        raise ValueError("Размер порции должен быть положительным")
+
+    if executor not in ('process', 'thread'):
+        raise ValueError(f"Неизвестный тип исполнителя: {executor}")
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    chunks = split_into_chunks(expressions, chunksize)
+    results = []
+
+    if executor == 'thread':
+        calculator = Calculator(cache_size=cache_size)
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for chunk_results in pool.map(
+                lambda chunk: calculate_chunk(calculator, chunk), chunks
+            ):
+                results.extend(chunk_results)
+
+        return results
+
+    if workers == 1:
+        calculator = Calculator(cache_size=cache_size)
+        for chunk in chunks:
+            results.extend(calculate_chunk(calculator, chunk))
+        return results
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initialize_worker,
+        initargs=(cache_size,)
+    ) as executor:
+        for chunk_results in executor.map(evaluate_chunk, chunks):
+            results.extend(chunk_results)
+
+    return results
+
+def common_prefix_length(first: str, second: str) -> int:
+    low, high = 0, min(len(first), len(second))
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[:middle] == second[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+def common_suffix_length(first: str, second: str, limit: int) -> int:
+    low, high = 0, limit
+
+    while low < high:
+        middle = (low + high + 1) // 2
+        if first[len(first) - middle:] == second[len(second) - middle:]:
+            low = middle
+        else:
+            high = middle - 1
+
+    return low
+
+def recompute_node_value(
+    node: Node,
+    values: Dict[int, float],
     operations: Dict[str, Callable],
-    precedence: Dict[str, int],
-    right_associative: set
+    functions: Dict[str, Callable]
 ) -> float:
-    tokens = tokenize_expression(expression, patterns)
-    
-    tree = build_syntax_tree(
-        tokens, constants, functions,
-        precedence, right_associative
-    )
+    if node.type == 'OPERATOR':
+        return operations[node.value](values[id(node.left)], values[id(node.right)])
+
+    if node.type == 'FUNCTION':
+        return functions[node.value](values[id(node.left)])
+
+    if node.value == 'u-':
+        return -values[id(node.left)]
+
+    return values[id(node.left)]
+
+class IncrementalSession:
+    OPERAND_TYPES = ('NUMBER', 'CONSTANT', 'VARIABLE')
+
+    def __init__(
+        self,
+        patterns: List[Tuple[re.Pattern, Optional[str]]],
+        constants: Dict[str, float],
+        functions: Dict[str, Callable],
+        operations: Dict[str, Callable],
+        precedence: Dict[str, int],
+        right_associative: set
+    ):
+        self.master_pattern, self.group_types = combine_compiled_patterns(patterns)
+        self.constants = constants
+        self.functions = functions
+        self.operations = operations
+        self.precedence = precedence
+        self.right_associative = right_associative
+
+        self.text = ''
+        self.tokens = []
+        self.tree = None
+        self.parents = {}
+        self.leaves = {}
+        self.values = None
+        self.statistics = {'full_parses': 0, 'patched_updates': 0, 'relexed_tokens': 0}
+
+    def relex(self, text: str) -> Tuple[list, int, int, int]:
+        old_text = self.text
+        old_tokens = self.tokens
+
+        prefix = common_prefix_length(old_text, text)
+        suffix = common_suffix_length(
+            old_text, text, min(len(old_text), len(text)) - prefix
+        )
+        delta = len(text) - len(old_text)
+        unchanged_from = len(old_text) - suffix
+
+        first = bisect_left(old_tokens, prefix, key=lambda token: token[3])
+        start = prefix
+        if first < len(old_tokens):
+            start = min(start, old_tokens[first][2])
+
+        resync = bisect_left(old_tokens, unchanged_from, key=lambda token: token[2])
+        region = []
+
+        for match in self.master_pattern.finditer(text, start):
+            position = match.start()
+
+            while resync < len(old_tokens) and old_tokens[resync][2] + delta < position:
+                resync += 1
+
+            if resync < len(old_tokens) and old_tokens[resync][2] + delta == position:
+                break
+
+            group_name = match.lastgroup
+            if group_name == 'MISMATCH':
+                raise ValueError(f'Некорректный символ: {match.group()}')
+
+            token_type = self.group_types[group_name]
+            if token_type:
+                region.append((token_type, match.group(), position, match.end()))
+        else:
+            resync = len(old_tokens)
+
+        self.statistics['relexed_tokens'] += len(region)
+
+        if delta:
+            suffix_tokens = [
+                (token_type, value, token_start + delta, token_end + delta)
+                for token_type, value, token_start, token_end in old_tokens[resync:]
+            ]
+        else:
+            suffix_tokens = old_tokens[resync:]
+
+        return old_tokens[:first] + region + suffix_tokens, first, len(region), resync
+
+    def can_patch(self, old_region: list, region: list) -> bool:
+        if self.tree is None or self.values is None:
+            return False
+
+        if len(region) != len(old_region):
+            return False
+
+        for old_token, new_token in zip(old_region, region):
+            if old_token[0] != new_token[0]:
+                return False
+            if old_token[1] != new_token[1] and new_token[0] != 'NUMBER':
+                return False
+
+        return True
+
+    def patch(self, first: int, old_region: list, region: list) -> float:
+        values = self.values
+
+        for offset, (old_token, new_token) in enumerate(zip(old_region, region)):
+            if old_token[1] == new_token[1]:
+                continue
+
+            node = self.leaves[first + offset]
+            node.value = create_number_node(new_token[1]).value
+            values[id(node)] = node.value
+
+            parent = self.parents.get(id(node))
+            while parent is not None:
+                values[id(parent)] = recompute_node_value(
+                    parent, values, self.operations, self.functions
+                )
+                parent = self.parents.get(id(parent))
+
+        self.statistics['patched_updates'] += 1
+
+        return values[id(self.tree)]
+
+    def rebuild(self, tokens: list) -> float:
+        self.tree = None
+        self.values = None
+        self.statistics['full_parses'] += 1
+
+        tree = build_syntax_tree(
+            [(token_type, value) for token_type, value, _, _ in tokens],
+            self.constants, self.functions,
+            self.precedence, self.right_associative
+        )
+
+        parents = {}
+        ordered_nodes = []
+        leaves = []
+        pending = [tree]
+
+        while pending:
+            current = pending.pop()
+            ordered_nodes.append(current)
+
+            if current.left is None:
+                leaves.append(current)
+                continue
+
+            for child in (current.left, current.right):
+                if child is not None:
+                    parents[id(child)] = current
+                    pending.append(child)
+
+        leaves.reverse()
+        operand_indexes = [
+            index for index, token in enumerate(tokens)
+            if token[0] in self.OPERAND_TYPES
+        ]
+
+        self.tree = tree
+        self.parents = parents
+        self.leaves = dict(zip(operand_indexes, leaves))
+
+        values = {}
+        for node in reversed(ordered_nodes):
+            if node.type == 'NUMBER':
+                values[id(node)] = evaluate_number_node(node)
+            elif node.type == 'VARIABLE':
+                values[id(node)] = evaluate_variable_node(node, None)
+            else:
+                values[id(node)] = recompute_node_value(
+                    node, values, self.operations, self.functions
+                )
 
-    return evaluate_expression_tree(tree, operations, functions)
+        self.values = values
+
+        return values[id(tree)]
+
+    def update(self, text: str) -> float:
+        old_tokens = self.tokens
+        tokens, first, region_size, resync = self.relex(text)
+        old_region = old_tokens[first:resync]
+        region = tokens[first:first + region_size]
+
+        self.text = text
+        self.tokens = tokens
+
+        if not self.can_patch(old_region, region):
+            return self.rebuild(tokens)
+
+        try:
+            return self.patch(first, old_region, region)
+        except Exception:
+            self.values = None
+            raise
+
+    def preview(self, text: str) -> Optional[float]:
+        try:
+            return self.update(text)
+        except Exception:
+            return None
 
 def run_test_cases(
     test_expressions: List[str],
@@ -411,6 +2833,60 @@ def run_test_cases(
         except Exception as error:
             print(f"Ошибка в '{expr}': {error}")
 
+def evaluate_outcome(function: Callable, *arguments: Any) -> Tuple[str, Any]:
+    try:
+        return 'value', function(*arguments)
+    except Exception as error:
+        return 'error', type(error).__name__
+
+def outcomes_match(first: Tuple[str, Any], second: Tuple[str, Any]) -> bool:
+    if first == second:
+        return True
+
+    return (
+        first[0] == second[0] == 'value'
+        and isinstance(first[1], float) and isinstance(second[1], float)
+        and math.isnan(first[1]) and math.isnan(second[1])
+    )
+
+def run_incremental_checks(
+    edit_sequences: List[List[str]],
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set
+) -> bool:
+    passed = 0
+    total = 0
+    patched = 0
+
+    for edits in edit_sequences:
+        session = IncrementalSession(
+            patterns, constants, functions,
+            operations, precedence, right_associative
+        )
+
+        for text in edits:
+            incremental = evaluate_outcome(session.update, text)
+            full = evaluate_outcome(
+                calculate_expression, text, patterns, constants, functions,
+                operations, precedence, right_associative
+            )
+
+            total += 1
+            if outcomes_match(incremental, full):
+                passed += 1
+            else:
+                print(f"Расхождение в '{text}': инкрементально {incremental}, полностью {full}")
+
+        patched += session.statistics['patched_updates']
+
+    print(f"Инкрементальные проверки: {passed} из {total} совпали, заплаток: {patched}")
+
+    return passed == total
+
 def run_interactive_mode(
     patterns: List[Tuple[re.Pattern, Optional[str]]],
     constants: Dict[str, float],
@@ -419,6 +2895,11 @@ def run_interactive_mode(
     precedence: Dict[str, int],
     right_associative: set
 ) -> None:
+    session = IncrementalSession(
+        patterns, constants, functions,
+        operations, precedence, right_associative
+    )
+
     print("\n" + "="*40)
     print("Калькулятор готов. Введите выражение:")
     print("(для выхода введите 'exit')")
@@ -431,25 +2912,330 @@ def run_interactive_mode(
             if expression.lower() == 'exit':
                 break
             
-            result = calculate_expression(
-                expression, patterns, constants, functions,
-                operations, precedence, right_associative
-            )
+            result = session.update(expression)
             print(f"= {result}")
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\nВыход...")
             break
         except Exception as e:
             print(f"Ошибка: {e}")
 
+def read_expression_lines(stream: TextIO) -> Iterator[Tuple[int, str]]:
+    for line_number, line in enumerate(stream, 1):
+        yield line_number, line.strip()
+
+def evaluate_expression_lines(
+    lines: Iterable[Tuple[int, str]],
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set,
+    cache: Optional[ParseCache] = None
+) -> Iterator[Tuple[str, bool]]:
+    for line_number, expression in lines:
+        if not expression:
+            yield '', True
+            continue
+
+        try:
+            result = calculate_expression(
+                expression, patterns, constants, functions,
+                operations, precedence, right_associative, cache
+            )
+            yield str(result), True
+        except Exception as error:
+            yield f"Ошибка в строке {line_number}: {error}", False
+
+def write_in_blocks(
+    results: Iterable[Tuple[str, bool]],
+    stream: TextIO,
+    block_size: int
+) -> Tuple[int, int]:
+    block = []
+    line_count = 0
+    error_count = 0
+
+    for output_line, succeeded in results:
+        block.append(output_line)
+        line_count += 1
+        if not succeeded:
+            error_count += 1
+
+        if len(block) >= block_size:
+            block.append('')
+            stream.write('\n'.join(block))
+            stream.flush()
+            block.clear()
+
+    if block:
+        block.append('')
+        stream.write('\n'.join(block))
+        stream.flush()
+
+    return line_count, error_count
+
+def run_batch_mode(
+    input_path: str,
+    output_path: str,
+    block_size: int,
+    patterns: List[Tuple[re.Pattern, Optional[str]]],
+    constants: Dict[str, float],
+    functions: Dict[str, Callable],
+    operations: Dict[str, Callable],
+    precedence: Dict[str, int],
+    right_associative: set,
+    cache: Optional[ParseCache] = None
+) -> int:
+    input_stream = sys.stdin if input_path == '-' else open(input_path, encoding='utf-8')
+    output_stream = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+
+    try:
+        results = evaluate_expression_lines(
+            read_expression_lines(input_stream),
+            patterns, constants, functions,
+            operations, precedence, right_associative, cache
+        )
+        line_count, error_count = write_in_blocks(results, output_stream, block_size)
+    finally:
+        if input_stream is not sys.stdin:
+            input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    print(f"Обработано строк: {line_count}, ошибок: {error_count}", file=sys.stderr)
+
+    return 1 if error_count else 0
+
+@lru_cache(maxsize=None)
+def combine_byte_pattern(master_pattern: re.Pattern) -> re.Pattern:
+    return re.compile(master_pattern.pattern.encode(), master_pattern.flags & ~re.UNICODE)
+
+def scan_byte_tokens(
+    buffer: Any,
+    start: int,
+    end: int,
+    master_pattern: re.Pattern,
+    group_types: Dict[str, Optional[str]]
+) -> List[Tuple[str, str]]:
+    tokens = []
+
+    for match in master_pattern.finditer(buffer, start, end):
+        group_name = match.lastgroup
+
+        if group_name == 'MISMATCH':
+            raise ValueError(f'Некорректный символ: {match.group().decode(errors="replace")}')
+
+        token_type = group_types[group_name]
+        if token_type:
+            tokens.append((token_type, match.group().decode()))
+
+    return tokens
+
+def split_byte_ranges(buffer: Any, parts: int) -> List[Tuple[int, int]]:
+    size = len(buffer)
+    ranges = []
+    start = 0
+
+    for index in range(1, parts + 1):
+        if start >= size:
+            break
+
+        end = size
+        if index < parts:
+            end = buffer.find(b'\n', max(start, size * index // parts)) + 1 or size
+
+        ranges.append((start, end))
+        start = end
+
+    return ranges
+
+def iterate_line_bounds(buffer: Any, start: int, end: int) -> Iterator[Tuple[int, int]]:
+    while start < end:
+        newline = buffer.find(b'\n', start, end)
+        line_end = end if newline < 0 else newline
+
+        yield start, line_end
+        start = line_end + 1
+
+def calculate_mapped_lines(
+    calculator: Calculator,
+    buffer: Any,
+    start: int,
+    end: int
+) -> List[Optional[Union[float, Exception]]]:
+    master_pattern = combine_byte_pattern(calculator.master_pattern)
+    results = []
+
+    for line_start, line_end in iterate_line_bounds(buffer, start, end):
+        try:
+            try:
+                tokens = scan_byte_tokens(
+                    buffer, line_start, line_end, master_pattern, calculator.group_types
+                )
+            except ValueError:
+                tokens = calculator.tokenize(
+                    buffer[line_start:line_end].decode('utf-8', errors='replace')
+                )
+
+            if not tokens:
+                results.append(None)
+                continue
+
+            results.append(calculator.evaluate(build_syntax_tree(
+                tokens, calculator.constants, calculator.functions,
+                calculator.precedence, calculator.right_associative,
+                calculator.number_type
+            )))
+        except Exception as error:
+            results.append(error)
+
+    return results
+
+def calculate_mapped_range(
+    calculator: Calculator,
+    path: str,
+    start: int,
+    end: int
+) -> List[Optional[Union[float, Exception]]]:
+    import mmap
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            return calculate_mapped_lines(calculator, mapping, start, end)
+
+def evaluate_mapped_range(
+    path: str,
+    start: int,
+    end: int
+) -> List[Optional[Union[float, Exception]]]:
+    return calculate_mapped_range(_worker_calculator, path, start, end)
+
+def calculate_mapped_file(
+    path: str,
+    workers: Optional[int] = None,
+    parts: Optional[int] = None
+) -> Iterator[Optional[Union[float, Exception]]]:
+    import mmap
+    from concurrent.futures import ProcessPoolExecutor
+
+    if os.path.getsize(path) == 0:
+        return
+
+    if parts is None:
+        parts = (workers or os.cpu_count() or 1) * 4
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+            ranges = split_byte_ranges(mapping, parts)
+
+    if workers == 1:
+        calculator = Calculator()
+        for start, end in ranges:
+            yield from calculate_mapped_range(calculator, path, start, end)
+        return
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=initialize_worker
+    ) as executor:
+        for results in executor.map(
+            evaluate_mapped_range, [path] * len(ranges),
+            [start for start, _ in ranges], [end for _, end in ranges]
+        ):
+            yield from results
+
+def format_mapped_results(
+    results: Iterable[Optional[Union[float, Exception]]]
+) -> Iterator[Tuple[str, bool]]:
+    for line_number, result in enumerate(results, 1):
+        if result is None:
+            yield '', True
+        elif isinstance(result, Exception):
+            yield f"Ошибка в строке {line_number}: {result}", False
+        else:
+            yield str(result), True
+
+def run_mapped_batch_mode(
+    input_path: str,
+    output_path: str,
+    block_size: int,
+    workers: Optional[int] = None
+) -> int:
+    if input_path == '-':
+        raise ValueError("Отображение в память недоступно для stdin")
+
+    output_stream = sys.stdout if output_path == '-' else open(output_path, 'w', encoding='utf-8')
+
+    try:
+        results = format_mapped_results(
+            calculate_mapped_file(input_path, workers)
+        )
+        line_count, error_count = write_in_blocks(results, output_stream, block_size)
+    finally:
+        if output_stream is not sys.stdout:
+            output_stream.close()
+
+    print(f"Обработано строк: {line_count}, ошибок: {error_count}", file=sys.stderr)
+
+    return 1 if error_count else 0
+
+def parse_arguments(arguments: Optional[List[str]] = None) -> 'argparse.Namespace':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Калькулятор выражений")
+    parser.add_argument(
+        '--batch', metavar='FILE',
+        help="вычислить выражения из файла построчно ('-' для stdin)"
+    )
+    parser.add_argument(
+        '--out', metavar='FILE', default='-',
+        help="файл для результатов ('-' для stdout)"
+    )
+    parser.add_argument(
+        '--block-size', type=int, default=1024,
+        help="количество строк в одном блоке записи"
+    )
+    parser.add_argument(
+        '--cache-size', type=int, default=4096,
+        help="размер кэша разобранных выражений (не используется с --mmap)"
+    )
+    parser.add_argument(
+        '--mmap', action='store_true',
+        help="читать файл --batch через отображение в память и делить его между процессами"
+    )
+    parser.add_argument(
+        '--workers', type=int,
+        help="количество процессов для --mmap"
+    )
+
+    return parser.parse_args(arguments)
+
 if __name__ == "__main__":
+    arguments = parse_arguments()
+
     patterns = get_compiled_patterns()
     constants = create_constants_map()
     operations = create_operations_map()
     functions = create_functions_map()
     precedence = create_precedence_map()
     right_associative = create_right_associative_set()
+
+    if arguments.batch and arguments.mmap:
+        sys.exit(run_mapped_batch_mode(
+            arguments.batch, arguments.out, arguments.block_size,
+            arguments.workers
+        ))
+
+    if arguments.batch:
+        sys.exit(run_batch_mode(
+            arguments.batch, arguments.out, arguments.block_size,
+            patterns, constants, functions,
+            operations, precedence, right_associative,
+            ParseCache(arguments.cache_size)
+        ))
     
     test_expressions = [
         "3 + 5 * 2",
@@ -473,6 +3259,23 @@ if __name__ == "__main__":
         functions, operations, precedence, right_associative
     )
     
+    incremental_edits = [
+        ["3 + 5 * 2", "3 + 7 * 2", "3 + 7 * 20", "3 + 7.5 * 20"],
+        ["12+3", "1+2+3", "12+3", "123", "12 3"],
+        ["sin(1)", "sin(1)1", "sin(1)", "sin(12)"],
+        ["pi*2", "pi2", "pi*2", "pi*22"],
+        ["(1 + 2) * 3", "(1 + 2 * 3", "(1 + 2) * 3", "1 + 2 * 3"],
+        ["log(1) + 1", "log(0) + 1", "log(2) + 1", "log(0) + 1", "log(3) + 1"],
+        ["2.5 ^ 10", "2.5 ^ 1000", "2.5 ^ 2", "2.5 ^ 1000", "2.5 ^ 3"],
+        ["sqrt(4) - 1", "sqrt(9) - 1", "sqrt(9) - 10", "sqrt(9) -", "sqrt(9) - 1"],
+        ["2 ^ 3 ^ 2", "2 ^ 3 ^ 0", "2 ^ 30 ^ 0", "-2 ^ 30 ^ 0"]
+    ]
+
+    run_incremental_checks(
+        incremental_edits, patterns, constants,
+        functions, operations, precedence, right_associative
+    )
+
     run_interactive_mode(
         patterns, constants, functions,
         operations, precedence, right_associative
@@ -0,0 +1,303 @@
+import sys
+import time
+import asyncio
+import argparse
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from calculator import Calculator, ResourceLimits, initialize_worker, evaluate_chunk
+
+class ServerState:
+    def __init__(
+        self,
+        inline_threshold: int = 256,
+        max_connections: int = 1024,
+        max_pending: int = 64,
+        workers: Optional[int] = None,
+        cache_size: int = 4096,
+        limits: Optional[ResourceLimits] = None
+    ):
+        self.inline_threshold = inline_threshold
+        self.max_connections = max_connections
+        self.connections = set()
+        self.pending = asyncio.Semaphore(max_pending)
+        self.calculator = Calculator(cache_size=cache_size, limits=limits)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=initialize_worker,
+            initargs=(cache_size, limits)
+        )
+
+    async def wait_connections_closed(self) -> None:
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+def format_result(result: object) -> str:
+    if isinstance(result, Exception):
+        return f"Ошибка: {result}"
+
+    return str(result)
+
+async def evaluate_request(expression: str, state: ServerState) -> str:
+    if len(expression) <= state.inline_threshold:
+        try:
+            return format_result(state.calculator.calculate(expression))
+        except Exception as error:
+            return format_result(error)
+
+    async with state.pending:
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(state.executor, evaluate_chunk, [expression])
+
+    return format_result(results[0])
+
+async def handle_client(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    state: ServerState
+) -> None:
+    if len(state.connections) >= state.max_connections:
+        writer.write("Ошибка: сервер перегружен\n".encode())
+        await writer.drain()
+        writer.close()
+        return
+
+    connection = asyncio.current_task()
+    state.connections.add(connection)
+
+    try:
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                writer.write("Ошибка: слишком длинная строка\n".encode())
+                break
+
+            if not line:
+                break
+
+            expression = line.decode(errors='replace').strip()
+            response = await evaluate_request(expression, state) if expression else ''
+
+            writer.write(f"{response}\n".encode())
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        state.connections.discard(connection)
+        writer.close()
+
+async def start_server(
+    state: ServerState,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    unix_path: Optional[str] = None,
+    max_line_length: int = 1 << 20
+) -> asyncio.AbstractServer:
+    async def client_connected(reader, writer):
+        await handle_client(reader, writer, state)
+
+    if unix_path:
+        return await asyncio.start_unix_server(
+            client_connected, unix_path, limit=max_line_length
+        )
+
+    return await asyncio.start_server(
+        client_connected, host, port, limit=max_line_length
+    )
+
+async def open_client(
+    host: str,
+    port: int,
+    unix_path: Optional[str] = None
+) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if unix_path:
+        return await asyncio.open_unix_connection(unix_path)
+
+    return await asyncio.open_connection(host, port)
+
+async def query_expressions(
+    expressions: List[str],
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    unix_path: Optional[str] = None
+) -> List[str]:
+    reader, writer = await open_client(host, port, unix_path)
+
+    writer.write(''.join(f"{expression}\n" for expression in expressions).encode())
+    await writer.drain()
+
+    responses = []
+    for _ in expressions:
+        responses.append((await reader.readline()).decode().rstrip('\n'))
+
+    writer.close()
+    await writer.wait_closed()
+
+    return responses
+
+async def run_load_client(
+    expressions: List[str],
+    requests: int,
+    latencies: List[float],
+    host: str,
+    port: int,
+    unix_path: Optional[str]
+) -> None:
+    reader, writer = await open_client(host, port, unix_path)
+
+    for index in range(requests):
+        expression = expressions[index % len(expressions)]
+        started = time.perf_counter()
+
+        writer.write(f"{expression}\n".encode())
+        await writer.drain()
+        await reader.readline()
+
+        latencies.append(time.perf_counter() - started)
+
+    writer.close()
+    await writer.wait_closed()
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+async def run_load(
+    expressions: List[str],
+    clients: int = 32,
+    requests: int = 1000,
+    host: str = '127.0.0.1',
+    port: int = 8765,
+    unix_path: Optional[str] = None
+) -> dict:
+    latencies = []
+    started = time.perf_counter()
+
+    await asyncio.gather(*(
+        run_load_client(expressions, requests, latencies, host, port, unix_path)
+        for _ in range(clients)
+    ))
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000
+    }
+
+def create_load_expressions() -> List[str]:
+    return [
+        "3 + 5 * 2",
+        "sin(pi / 4) ^ 2 + cos(pi / 4) ^ 2",
+        "sqrt(16) * abs(-3) - log(e)",
+        "((1 + 2) * (3 + 4)) / (5 - 6)",
+        " + ".join(f"{i} * {i}" for i in range(200))
+    ]
+
+async def serve(arguments: argparse.Namespace) -> None:
+    limits = None
+    values = (
+        arguments.max_tokens, arguments.max_depth,
+        arguments.max_magnitude, arguments.time_budget
+    )
+    if any(value is not None for value in values):
+        limits = ResourceLimits(*values)
+
+    state = ServerState(
+        arguments.inline_threshold, arguments.max_connections,
+        arguments.max_pending, arguments.workers, limits=limits
+    )
+    server = await start_server(state, arguments.host, arguments.port, arguments.unix)
+
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        state.close()
+
+async def load(arguments: argparse.Namespace) -> None:
+    state = None
+    server = None
+
+    if arguments.spawn:
+        state = ServerState(workers=arguments.workers)
+        server = await start_server(state, arguments.host, arguments.port, arguments.unix)
+
+    try:
+        report = await run_load(
+            create_load_expressions(), arguments.clients, arguments.requests,
+            arguments.host, arguments.port, arguments.unix
+        )
+    finally:
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+            await state.wait_connections_closed()
+            state.close()
+
+    for key, value in report.items():
+        print(f"{key}: {value:.3f}" if isinstance(value, float) else f"{key}: {value}")
+
+async def client(arguments: argparse.Namespace) -> None:
+    expressions = arguments.expressions or [line.strip() for line in sys.stdin]
+
+    for response in await query_expressions(
+        expressions, arguments.host, arguments.port, arguments.unix
+    ):
+        print(response)
+
+def parse_arguments(arguments: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Сетевой сервер калькулятора")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help="путь к Unix-сокету")
+    parser.add_argument('--workers', type=int, help="количество процессов для больших выражений")
+
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="запустить сервер")
+    serve_parser.add_argument('--inline-threshold', type=int, default=256,
+                              help="максимальная длина выражения для вычисления в цикле событий")
+    serve_parser.add_argument('--max-connections', type=int, default=1024)
+    serve_parser.add_argument('--max-pending', type=int, default=64,
+                              help="максимум выражений в очереди пула процессов")
+    serve_parser.add_argument('--max-tokens', type=int, help="максимум токенов в выражении")
+    serve_parser.add_argument('--max-depth', type=int, help="максимальная глубина дерева")
+    serve_parser.add_argument('--max-magnitude', type=float,
+                              help="максимальный модуль промежуточного значения")
+    serve_parser.add_argument('--time-budget', type=float, metavar='SECONDS',
+                              help="время на вычисление одного выражения")
+
+    client_parser = commands.add_parser('client', help="отправить выражения серверу")
+    client_parser.add_argument('expressions', nargs='*')
+
+    load_parser = commands.add_parser('load', help="измерить пропускную способность и задержки")
+    load_parser.add_argument('--clients', type=int, default=32)
+    load_parser.add_argument('--requests', type=int, default=1000,
+                             help="количество запросов на одного клиента")
+    load_parser.add_argument('--spawn', action='store_true',
+                             help="запустить сервер в этом же процессе")
+
+    return parser.parse_args(arguments)
+
+if __name__ == "__main__":
+    arguments = parse_arguments()
+    command = {'serve': serve, 'client': client, 'load': load}[arguments.command]
+
+    try:
+        asyncio.run(command(arguments))
+    except KeyboardInterrupt:
+        print("\nВыход...")